@@ -1,294 +1,139 @@
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify
-from flask_session import Session
-from flask_sqlalchemy import SQLAlchemy
-from functools import wraps # Comes with python so no need to install via requirements.txt
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Flask, Response, render_template, stream_template, stream_with_context, request, session, redirect, url_for, jsonify
+import click
+import logging
+import threading
 from datetime import datetime
-from dash import Dash, dcc, html
-from dash.dependencies import Input, Output
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from models import User, Exercise, Log, Program, MesoCycle, TrainingWeek, TrainingSession # Import your models
-from extensions import db # Import db from extensions
+from models import User, Program, MesoCycle, TrainingWeek, TrainingSession # Import your models
+from extensions import db, init_db # Import db from extensions
+from config import Config
+from sessions import init_sessions, login_required
+from instrumentation import init_instrumentation, metrics
+from compression import init_compression, init_static_fingerprints
+from passwords import PasswordHashingBusy, hash_password, verify_password
+from migrations import run_migrations, split_reps
+from cache import figure_cache
+from rollups import check_weekly_volume, rebuild_weekly_volume
+from services import insert_logs, resolve_exercise_ids
+from exports import EXPORT_FORMATS, ExportUnavailable, export_history
+from importer import IMPORT_FORMATS, import_logs, text_stream
+from queries import PAGE_SIZE, logs_page, program_structure, user_history, user_programs
+from timeseries import SERIES_BINS, SERIES_MAX_POINTS, SERIES_METRICS, exercise_series, personal_records
 
 
 app = Flask(__name__)
 
-# Initialize Dash
-dash_app = Dash(__name__, server=app, url_base_pathname='/dashboard/')
+# Configure the database & sessions (SQLite & signed cookies unless the environment says otherwise, see config.py)
+app.config.from_object(Config)
 
-# Configure session to use filesystem (instead of signed cookies)
-app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_TYPE"] = "filesystem"
-Session(app)
+# Initialize SQLAlchemy with the app AFTER it's created
+init_db(app)
 
-# Configure SQLite database
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Sessions may be stored in the database, so they come after it
+init_sessions(app)
 
-# Initialize SQLAlchemy with the app AFTER it's created
-db.init_app(app)
+# Request & SQL timings, slow query logging & optional profiling, exposed on /metrics
+init_instrumentation(app)
 
-# Create the database and tables if they don't exist
-def create_db():
-    with app.app_context():
-        print("Creating database and tables...")
-        db.create_all()
+# Compressed responses, and static files with fingerprinted URLs browsers can cache for good
+init_compression(app)
+init_static_fingerprints(app)
+
+logger = logging.getLogger(__name__)
 
-def login_required(f):
-    """
-    Decorate routes to require login.
 
-    https://flask.palletsprojects.com/en/latest/patterns/viewdecorators/
+class LazyDashboard:
+    """
+    WSGI middleware handing /dashboard/ requests to the Dash server in dashboard.py.
+    Dash, Plotly & pandas are only imported when the dashboard is first requested (or load() is called).
     """
 
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if session.get("user_id") is None:
-            return redirect("/login")
-        return f(*args, **kwargs)
-
-    return decorated_function
-
-### Dash Layout ###
-
-# Define the layout for Dash
-# Dash layout with 4 dropdowns
-dash_app.layout = html.Div([
-    # Program Dropdown
-    dcc.Dropdown(
-        id='program-dropdown',
-        placeholder="Select a Program",
-        style={'width': '50%'}
-    ),
-    # Week Dropdown
-    dcc.Dropdown(
-        id='week-dropdown',
-        placeholder="Select a Week",
-        style={'width': '50%'}
-    ),
-    # Session Dropdown
-    dcc.Dropdown(
-        id='session-dropdown',
-        placeholder="Select a Session",
-        style={'width': '50%'}
-    ),
-    # Exercise Dropdown
-    dcc.Dropdown(
-        id='exercise-dropdown',
-        placeholder="Select an Exercise",
-        style={'width': '50%'}
-    ),
-    # Metric Dropdown
-    dcc.Dropdown(
-        id='metric-dropdown',
-        options=[
-        {'label': 'Volume', 'value': 'volume'},
-        {'label': 'Load over Time', 'value': 'load'},
-        {'label': 'Reps over Time', 'value': 'reps'}
-        ],
-        value='volume',  # Default value
-        clearable=False
-    ),
-
-    # Placeholder for graph
-    dcc.Graph(id='filtered-graph')
-])
-
-### Dash Callbacks ###
-@dash_app.callback(
-    Output('program-dropdown', 'options'),
-    Input('program-dropdown', 'value')
-)
-def load_programs(_):
-    programs = Program.query.all()
-    return [{'label': program.name, 'value': program.id} for program in programs]
-
-
-@dash_app.callback(
-    Output('week-dropdown', 'options'),
-    Input('program-dropdown', 'value')  # Triggered when a program is selected
-)
-def load_weeks(program_id):
-    if program_id is None:
-        return []
-    weeks = TrainingWeek.query.join(MesoCycle).filter(MesoCycle.program_id == program_id).all()
-    options = [{'label': f'Week {week.week_number}', 'value': week.id} for week in weeks]
-    # Add "All Weeks" option
-    options.insert(0, {'label': 'All Weeks', 'value': 'all'})
-    return options
-
-
-@dash_app.callback(
-    Output('session-dropdown', 'options'),
-    Input('week-dropdown', 'value')  # Triggered when a week is selected
-)
-def load_sessions(week_id):
-    if week_id is None:
-        return []
-    # Handle "All Weeks" by not filtering by week
-    if week_id == 'all':
-        sessions = TrainingSession.query.all()  # Fetch sessions across all weeks
-    else:
-        sessions = TrainingSession.query.filter_by(training_week_id=week_id).all()
-
-    # Add the "All Sessions" option at the start of the dropdown
-    session_options = [{'label': 'All Sessions', 'value': 'all'}] + [{'label': session.name, 'value': session.id} for session in sessions]
-
-    return session_options
-
-
-@dash_app.callback(
-    Output('exercise-dropdown', 'options'),
-    Input('session-dropdown', 'value')  # Triggered when a session is selected
-)
-def load_exercises(session_id):
-    if session_id is None:
-        return []
-    exercises = Log.query.join(Exercise).filter(Log.training_session_id == session_id).all()
-
-    # Access the exercise_name via the relationship
-    return [{'label': log.exercise.exercise_name, 'value': log.exercise.id} for log in exercises]
-
-
-@dash_app.callback(
-    Output('filtered-graph', 'figure'),
-    [Input('program-dropdown', 'value'),
-    Input('week-dropdown', 'value'),
-    Input('session-dropdown', 'value'),
-    Input('exercise-dropdown', 'value'),
-    Input('metric-dropdown', 'value')]  # Metric selection]
-)
-def update_graph(program_id, week_id, session_id, exercise_id, metric):
-
-    # Query logs based on the filters and ensure necessary joins
-    query = Log.query\
-        .join(TrainingSession, Log.training_session_id == TrainingSession.id)\
-        .join(TrainingWeek, TrainingSession.training_week_id == TrainingWeek.id, isouter=True)\
-        .join(MesoCycle, TrainingWeek.meso_cycle_id == MesoCycle.id, isouter=True)
-        
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.dashboard = None
+        self._lock = threading.Lock()
 
-    # Filter based on MesoCycle if program_id is provided
-    if program_id:
-        query = query.filter(MesoCycle.program_id == program_id)
+    def load(self):
+        with self._lock:
+            if self.dashboard is None:
+                from dashboard import create_dashboard
+                self.dashboard = create_dashboard(self.app)
+        return self.dashboard
 
-    # Handle "All Weeks" scenario
-    if week_id and week_id != 'all':
-        query = query.filter(TrainingWeek.id == week_id)  # Filter based on TrainingWeek.id
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith('/dashboard/'):
+            return self.load()(environ, start_response)
+        return self.wsgi_app(environ, start_response)
 
-    if session_id and session_id != 'all':
-        query = query.filter(TrainingSession.id == session_id)
 
-    if exercise_id:
-        query = query.filter(Log.exercise_id == exercise_id)
+# Mount the dashboard lazily (default), right away, or not at all when it has worker processes of its own
+if app.config['DASHBOARD'] != 'off':
+    app.wsgi_app = LazyDashboard(app)
+    if app.config['DASHBOARD'] == 'eager':
+        app.wsgi_app.load()
 
-    print(str(query))  # Prints the SQL query
-    logs = query.all()
+# Create the database and tables if they don't exist
+def create_db():
+    with app.app_context():
+        logger.info("Creating database and tables...")
+        db.create_all()
+        run_migrations()  # Bring existing databases up to date (e.g. backfilling per set rows)
+
+@app.cli.command("rebuild-weekly-volume")
+@click.option("--check", is_flag=True, help="Only report rows that don't match the logs, without rebuilding.")
+def rebuild_weekly_volume_command(check):
+    """Rebuild the weekly volume rollup from the logs, or check it for consistency."""
+    if check:
+        with db.engine.connect() as connection:
+            differences = check_weekly_volume(connection)
+        for key, stored, expected in differences:
+            click.echo(f"{key}: stored {stored}, expected {expected}")
+        click.echo(f"{len(differences)} weekly volume rows differ from the logs")
+        if differences:
+            raise SystemExit(1)
+    else:
+        with db.engine.begin() as connection:
+            rebuild_weekly_volume(connection)
+        click.echo("Weekly volume rebuilt")
 
+@app.cli.command("import-logs")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "username", required=True, help="User the logs belong to.")
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), help="Defaults to the file's extension.")
+def import_logs_command(path, username, fmt):
+    """Bulk import historical logs from a CSV or JSON lines file, see importer.py for the columns."""
+    user = User.query.filter_by(user_name=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}")
 
-    if not logs:
-    # Return an empty figure with no data if no logs are found
-        return go.Figure()
-    
+    fmt = fmt or ('csv' if path.endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = import_logs(user.id, f, fmt)
 
-    # Extract log data
-    data = [{
-        'Exercise': log.exercise.exercise_name,
-        'Volume': log.load * log.sets * sum([int(rep) for rep in log.reps.split(',')]),  # Sum reps for all sets
-        'Load': log.load,
-        'Reps': sum([int(rep) for rep in log.reps.split(',')]),  # Total reps from all sets
-        'Reps Per Set': [int(rep) for rep in log.reps.split(',')],  # Reps per set as a list
-        'Sets': log.sets,
-        'Session ID': log.training_session_id,  # Include Session ID for comparison
-        'Week ID': log.training_week_id,  # Include Week ID for comparison
-        'Week Number': int(log.training_week.week_number),
-        'Time': log.timestamp,
-        'Total Weeks': log.mesocycle.total_weeks
-    } for log in logs]
-
-
-    df = pd.DataFrame(data)
-    # Debugging print to see the content of the DataFrame
-    print(df)
-    print(f"Total logs: {len(logs)}")
-    print(f"Rows in DataFrame: {len(df)}")
-
-
-    # Ensure the DataFrame is not empty
-    if df.empty:
-        return go.Figure()
-    
-    
-# Create figures based on selected metric
-    if metric == 'volume':
-        # Group the data by Week Number and Exercise to get total volume per week per exercise
-        week_summary = df.groupby(['Week Number', 'Exercise']).agg({'Volume': 'sum'}).reset_index()
-        # Debugging step to verify the week summary
-        print(week_summary)
-
-        # Create a bar chart to display Volume by Exercise across all weeks
-        fig = px.bar(week_summary, 
-                x='Week Number', 
-                y='Volume', 
-                color='Exercise',  # Differentiate each exercise by color
-                title='Total Volume by Exercise Across All Weeks',
-                barmode='group',
-                labels={'Volume': 'Total Volume', 'Week Number': 'Week Number'})
-        return fig
-
-    # Create figures based on selected metric
-    if metric == 'load':
-        # Group the data by Week Number and Exercise to get the total load per week per exercise
-        week_summary = df.groupby(['Week Number', 'Exercise']).agg({'Load': 'sum'}).reset_index()
-
-        # Debugging step to verify the week summary
-        print(week_summary)
-
-        # Create a bar chart to display Load by Exercise across all weeks
-        fig = px.bar(week_summary, 
-                x='Week Number', 
-                y='Load', 
-                color='Exercise',  # Differentiate each exercise by color
-                title='Total Load by Exercise Across All Weeks',
-                barmode='group',  # Group bars by Week and Exercise
-                labels={'Load': 'Total Load', 'Week Number': 'Week Number'})
-        return fig
-
-    if metric == 'reps':
-        # Step 1: Flatten the Reps Per Set data
-        reps_data = []
-        for log in logs:
-            for set_num, reps in enumerate(log.reps.split(','), 1):  # Enumerate over sets, starting from 1
-                reps_data.append({
-                    'Exercise': log.exercise.exercise_name,
-                    'Reps': int(reps),
-                    'Set Number': set_num,  # Track the set number
-                    'Week Number': int(log.training_week.week_number),
-                    'Session ID': log.training_session_id
-                })
-
-        # Step 2: Convert to DataFrame
-        df_reps = pd.DataFrame(reps_data)
-
-        # Step 3: Group by Week, Exercise, and Set Number
-        # Aggregate reps per set, since each set should have individual reps
-        week_summary_reps = df_reps.groupby(['Week Number', 'Exercise', 'Set Number']).agg({'Reps': 'sum'}).reset_index()
-
-        # Step 4: Create a line chart to display Reps per Set across weeks
-        fig = px.line(week_summary_reps,
-                    x='Week Number', 
-                    y='Reps', 
-                    color='Exercise',  # Differentiate each exercise by color
-                    line_group='Set Number',  # Differentiate lines by set number within each exercise
-                    title='Reps Per Set by Exercise Across All Weeks',
-                    labels={'Reps': 'Reps Per Set', 'Week Number': 'Week Number', 'Set Number': 'Set Number'},
-                    markers=True)  # Optionally add markers to see each point
-        return fig
+    for row_number, error in result.errors:
+        click.echo(f"row {row_number}: {error}", err=True)
+    click.echo(f"{result.imported} logs imported, {len(result.errors)} rows skipped")
 
 
 ### Routes ###
 
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of this worker's dashboard figure cache, for monitoring."""
+    return jsonify(figure_cache.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """This worker's request, SQL, Dash callback & figure cache metrics in the Prometheus text format."""
+    stats = figure_cache.stats()
+    metrics.set("figure_cache_size", "Dashboard figures cached.", stats["size"])
+    metrics.set("figure_cache_maxsize", "Most dashboard figures cached at once.", stats["maxsize"])
+    for name in ("hits", "misses", "evictions", "invalidations"):
+        metrics.set(f"figure_cache_{name}_total", f"Dashboard figure cache {name}.", stats[name], kind="counter")
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
 @app.route("/", methods=["GET"]) 
 def index():
     return render_template("index.html")
@@ -328,8 +173,8 @@ def register():
 
         # Add to database
         try:
-            # Hash password
-            hashed_pass = generate_password_hash(pass_1, method='pbkdf2', salt_length=16)
+            # Hash password, off the request thread
+            hashed_pass = hash_password(pass_1)
             #db.execute("INSERT INTO users(username, hash) VALUES(?, ?)", request.form.get("username"), hashed_pass)
             new_user = User(user_name=request.form.get("username"), hash=hashed_pass)
             db.session.add(new_user)
@@ -337,6 +182,8 @@ def register():
 
         except ValueError as e:
             return "BAD APE! " + str(e)
+        except PasswordHashingBusy:
+            return "BAD APE! Too many people are signing in right now, please try again.", 503
 
         # Query database for username
         #rows = db.execute("SELECT * FROM users WHERE username = ?", request.form.get("username"))
@@ -373,8 +220,11 @@ def login():
         user = User.query.filter_by(user_name=request.form.get("username")).first()
 
         # Ensure username exists and password is correct
-        if user is None or not check_password_hash(user.hash, request.form.get("password")):
-            return "BAD APE! Invalid username and/or password."
+        try:
+            if user is None or not verify_password(user.hash, request.form.get("password")):
+                return "BAD APE! Invalid username and/or password."
+        except PasswordHashingBusy:
+            return "BAD APE! Too many people are signing in right now, please try again.", 503
 
         # Remember which user has logged in
         session["user_id"] = user.id
@@ -402,8 +252,8 @@ def logout():
 @app.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
-    # Fetch programs from the database
-    programs = Program.query.all()  # Fetch all programs (adjust as needed)
+    # Fetch the user's programs from the database
+    programs = user_programs(session['user_id']).all()
     
     if request.method == 'POST':
         # Handle form submission logic here
@@ -417,26 +267,74 @@ def create():
 def display():
     # Fetch user logs or other data from the database
     user_id = session["user_id"]  # Assuming you store user_id in the session
-    
-    # Example query to get logs for the current user
-    logs = Log.query.filter_by(user_id=user_id).all()
-
-    # Convert logs to a structured format to pass to the template
-    log_data = [
-        {
-            "Timestamp": log.timestamp,
-            "Exercise": log.exercise.exercise_name if log.exercise else None,
-            "Load": log.load,
-            "Sets": log.sets,
-            "Reps": log.reps,
-            "RIR": log.rir,
-            "Session": log.training_session.name if log.training_session else None,
-        }
-        for log in logs
-    ]
+
+    # ?stream=1 renders the entire history, sending rows to the browser as they're read from the database
+    if request.args.get("stream"):
+        logs = user_history(user_id).yield_per(PAGE_SIZE)
+        return stream_template("display.html", logs=(log_row(log) for log in logs), streaming=True)
+
+    # Otherwise show one page at a time, ?after / ?before hold the cursor of the page edge
+    try:
+        logs, next_cursor, prev_cursor = logs_page(user_id, after=request.args.get("after"), before=request.args.get("before"))
+    except ValueError:
+        return "BAD APE! Invalid page cursor.", 400
 
     # Pass the data to the display.html template
-    return render_template("display.html", logs=log_data)
+    return render_template("display.html", logs=[log_row(log) for log in logs], next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+@app.route("/export", methods=["GET"])
+@login_required
+def export():
+    """Download the user's whole history, one row per set, as ?format=csv (default), parquet or arrow."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return "BAD APE! Export format must be one of " + ", ".join(EXPORT_FORMATS) + ".", 400
+
+    try:
+        chunks = export_history(session["user_id"], fmt)
+    except ExportUnavailable as e:
+        return "BAD APE! " + str(e), 501
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    # Streamed chunk by chunk as the rows come off the cursor
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=training_history.{extension}"})
+
+
+@app.route("/import", methods=["POST"])
+@login_required
+def import_history():
+    """
+    Bulk import logs from an uploaded CSV or JSON lines file (form field "file").
+    The format comes from ?format= or the file's extension. Reports how many logs landed & why any rows didn't.
+    """
+    upload = request.files.get("file")
+    if upload is None:
+        return "BAD APE! Please upload a file.", 400
+
+    fmt = request.args.get("format") or ("csv" if (upload.filename or "").endswith(".csv") else "jsonl")
+    if fmt not in IMPORT_FORMATS:
+        return "BAD APE! Import format must be one of " + ", ".join(IMPORT_FORMATS) + ".", 400
+
+    result = import_logs(session["user_id"], text_stream(upload.stream), fmt)
+    return jsonify({
+        "imported": result.imported,
+        "errors": [{"row": row_number, "error": error} for row_number, error in result.errors],
+    })
+
+
+def log_row(log):
+    """Convert a log to the structured format the history table renders."""
+    return {
+        "Timestamp": log.timestamp,
+        "Exercise": log.exercise.exercise_name if log.exercise else None,
+        "Load": log.load,
+        "Sets": log.sets,
+        "Reps": [log_set.reps for log_set in log.log_sets],
+        "RIR": log.rir,
+        "Session": log.training_session.name if log.training_session else None,
+    }
 
 
 @app.route("/design", methods=["GET", "POST"])
@@ -448,9 +346,10 @@ def design():
 
 
 @app.route('/submit-log', methods=['POST'])
+@login_required
 def submit_log():
     # Get data from the form
-    user_id = request.form.get('user_id')  # Ensure user_id is present
+    user_id = session['user_id']  # Logs always belong to the logged in user
     program_id = request.form.get('program_id')  # Get the selected program ID
     exercise_names = request.form.getlist('exercise_name[]')  # List of exercise names
     loads = request.form.getlist('load[]')  # List of loads
@@ -460,7 +359,11 @@ def submit_log():
     session_day = int(request.form.get('session_day'))  # Selected day for the session (from dropdown)
     session_name = request.form.get('session_name')  # Session name (optional)
 
-    print(f"Program ID: {program_id}, Week Number: {new_week_number}")  # Debugging
+    logger.debug("Program ID: %s, Week Number: %s", program_id, new_week_number)
+
+    # Only log into the user's own programs (or shared ones), never someone else's
+    if user_programs(user_id).filter(Program.id == program_id).first() is None:
+        return "BAD APE! Program not found.", 404
 
     # Fetch relevant mesocycle pertaining to this log
     mesocycle = MesoCycle.query.filter_by(program_id=program_id).first()
@@ -475,9 +378,10 @@ def submit_log():
     base_week = next((week for week in training_weeks if week.week_number == 1), None) # Get the base week, should be present after program creation
     training_week = next((week for week in training_weeks if week.week_number == new_week_number), None)
 
+    # Everything below is one unit of work: new rows are flushed to get their ids & committed together at the end
     if not training_week:
         # Handle the case where no matching training week is found
-        print("No matching training week found")
+        logger.debug("No matching training week found, adding week %s", new_week_number)
         # Create a new training week if new_week_number is not found in the database
         new_training_week = TrainingWeek(
             week_number=new_week_number, 
@@ -485,7 +389,7 @@ def submit_log():
             week_split=base_week.week_split
         )
         db.session.add(new_training_week)
-        db.session.commit()
+        db.session.flush()  # Flush to get the ID without committing
         training_week_id = new_training_week.id
     else:
         training_week_id = training_week.id
@@ -502,15 +406,15 @@ def submit_log():
             training_week_id=training_week_id
         )
         db.session.add(new_training_session)
-        db.session.commit()
-            # After committing, the new session's ID is accessible
+        db.session.flush()  # Flush to get the ID without committing
         training_session_id = new_training_session.id
     else:
         # Use the existing session's ID
         training_session_id = training_session.id
 
 
-    # Loop through each exercise entry
+    # Collect each exercise entry
+    entries = []
     for i in range(len(exercise_names)):
         ex_name = exercise_names[i].strip()
         load_value = int(loads[i]) if loads[i] else 0
@@ -521,40 +425,34 @@ def submit_log():
         if not all([ex_name, load_value, sets_value, rir_value]):
             continue
 
-        # Check if the exercise already exists in the Exercise table
-        exercise = Exercise.query.filter_by(exercise_name=ex_name).first()
-
-        # If the exercise doesn't exist, create a new one
-        if not exercise:
-            new_exercise = Exercise(exercise_name=ex_name)
-            db.session.add(new_exercise)
-            db.session.commit()  # Commit to get the ID for the new exercise
-            db.session.flush()  # Flush to get the ID without committing
-            exercise_id = new_exercise.id  # Use the ID of the newly created exercise
-        else:
-            exercise_id = exercise.id  # Use the existing exercise ID
-
         # Capture reps for each set and join them into a CSV string
         reps = request.form.getlist(f'reps[{i}][]')  # Get reps for this exercise (row i)
         reps_csv = ','.join(reps) if reps else ''
 
-        # Create a new log entry
-        log = Log(
-            user_id=user_id,
-            program_id=program_id,  # Save the selected program ID  # Use the retrieved or newly created exercise ID
-            mesocycle_id=mesocycle.id,
-            exercise_id=exercise_id,
-            training_session_id=training_session_id,  # Associate the log with the session
-            training_week_id=training_week_id,
-            load=load_value,
-            sets=sets_value,
-            reps=reps_csv,  # Store CSV string of reps
-            rir=rir_value,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(log)
-
-    # Commit all log entries to the database
+        entries.append((ex_name, load_value, sets_value, rir_value, reps_csv))
+
+    # Look up every exercise at once, creating the ones that don't exist yet
+    exercise_ids = resolve_exercise_ids(ex_name for ex_name, *_ in entries)
+
+    timestamp = datetime.utcnow()
+    logs = [{
+        'user_id': user_id,
+        'program_id': program_id,  # Save the selected program ID
+        'mesocycle_id': mesocycle.id,
+        'exercise_id': exercise_ids[ex_name],  # Use the retrieved or newly created exercise ID
+        'training_session_id': training_session_id,  # Associate the log with the session
+        'training_week_id': training_week_id,
+        'load': load_value,
+        'sets': sets_value,
+        'reps': reps_csv,  # Store CSV string of reps
+        'rir': rir_value,
+        'timestamp': timestamp
+    } for ex_name, load_value, sets_value, rir_value, reps_csv in entries]
+
+    # Bulk insert the logs along with their typed per set rows
+    insert_logs(logs, [split_reps(reps_csv) for *_, reps_csv in entries])
+
+    # Commit the whole submission at once
     db.session.commit()
 
     # Flash success message and redirect
@@ -562,6 +460,7 @@ def submit_log():
     return redirect(url_for('index'))
 
 @app.route('/create_program', methods=['POST'])
+@login_required
 def create_program():
     program_name = request.form.get('program_name')
     start_date_str = request.form.get('start_date')
@@ -575,7 +474,7 @@ def create_program():
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
 
     # Create the program
-    program = Program(name=program_name)
+    program = Program(name=program_name, user_id=session['user_id'])
     db.session.add(program)
     db.session.commit()
 
@@ -605,63 +504,96 @@ def get_day_name(day_number):
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     return days[day_number - 1]  # Since day_number is 1-based
 
-@app.route('/log/<int:program_id>', methods=['GET'])
-def log_form(program_id):
-    # Get the Program by its ID
-    program = Program.query.get(program_id)
-
-    # Retrieve associated training weeks (assuming one week, adjust if needed)
-    training_weeks = TrainingWeek.query.filter_by(meso_cycle_id=program.id).all()
-
-    # Extract week split from the CSV stored in the relevant TrainingWeek
-    training_days = []
-    for week in training_weeks:
-        training_days.extend([int(day) for day in week.week_split.split(',')])
-
-    # Generate a list of available day names for the dropdown
-    available_days = [(day, get_day_name(day)) for day in set(training_days)]  # Use set to avoid duplicates
-
-    # Render the log form, passing the available days
-    return render_template('create.html', available_days=available_days)
-
-@app.route('/get_training_days/<int:program_id>', methods=['GET'])
-def get_training_days(program_id):
-    # Fetch the program based on its ID
-    program = Program.query.get(program_id)
-    if not program:
-        return jsonify({'error': 'Program not found GET_TRAINING_DAYS'}), 404
-
-    # Fetch the meso cycle and training week associated with the program
-    meso_cycle = MesoCycle.query.filter_by(program_id=program_id).first()
-    training_week = TrainingWeek.query.filter_by(meso_cycle_id=meso_cycle.id).first()
-
-    # Extract training days from the CSV stored in `training_week.training_days`
-    training_days = [int(day) for day in training_week.week_split.split(',')]
-    available_days = [(day, get_day_name(day)) for day in training_days]
+@app.route('/api/programs/<int:program_id>/structure', methods=['GET'])
+@login_required
+def program_structure_api(program_id):
+    """
+    A program's meso cycles, weeks & sessions in one response, plus the total weeks & training days
+    the log form needs. Tagged with an ETag of its content, so unchanged programs are answered with a 304.
+    """
+    rows = program_structure(session['user_id'], program_id)
+    if not rows:
+        return jsonify({'error': 'Program not found'}), 404
 
-    return jsonify(available_days)
+    return conditional_json(structure_json(rows))
 
-@app.route('/get_training_weeks/<int:program_id>', methods=['GET'])
-def get_training_weeks(program_id):
-    # Fetch the program based on its ID
-    program = Program.query.get(program_id)
-    if not program:
-        return jsonify({'error': 'Program not found GET_TRAINING_WEEKS'}), 404
 
-    # Fetch the meso cycle and training weekS associated with the program
-    meso_cycle = MesoCycle.query.filter_by(program_id=program_id).first()
-    training_weeks = meso_cycle.total_weeks
+@app.route('/api/timeseries', methods=['GET'])
+@login_required
+def timeseries_api():
+    """
+    A metric per exercise over time for long range charts, pre-binned & downsampled so the response stays small, e.g.
+    ?metric=e1rm&bin=month&program_id=1&exercise_id=3&points=200&best=1 (see timeseries.py).
+    """
+    metric = request.args.get('metric', 'e1rm')
+    bin = request.args.get('bin', 'week')
+    if metric not in SERIES_METRICS:
+        return jsonify({'error': 'metric must be one of ' + ', '.join(SERIES_METRICS)}), 400
+    if bin not in SERIES_BINS:
+        return jsonify({'error': 'bin must be one of ' + ', '.join(SERIES_BINS)}), 400
+    points = min(max(request.args.get('points', SERIES_MAX_POINTS, type=int), 3), SERIES_MAX_POINTS)
+
+    series = exercise_series(
+        session['user_id'], metric, bin,
+        program_id=request.args.get('program_id', type=int),
+        exercise_id=request.args.get('exercise_id', type=int),
+        points=points,
+        best=request.args.get('best') in ('1', 'true')
+    )
+    return conditional_json({'metric': metric, 'bin': bin, 'points': points, 'series': series})
 
-    # Check if no training weeks are found
-    if not training_weeks:
-        print("No training weeks found for this program_id")  # Debugging line
-    
-    # Return the total week number
-    return jsonify({'total_weeks': training_weeks})
 
+@app.route('/api/personal-records', methods=['GET'])
+@login_required
+def personal_records_api():
+    """Each exercise's heaviest set, best estimated 1RM, most reps in a set & biggest day of volume, with when."""
+    return conditional_json({'records': personal_records(session['user_id'])})
+
+
+def conditional_json(data):
+    """A JSON response tagged with an ETag of its content, answered with a 304 when the browser already has it."""
+    response = jsonify(data)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Browsers revalidate every time, which costs a 304 when nothing changed
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def structure_json(rows):
+    """Nest the flat rows of program_structure into program -> meso cycles -> weeks -> sessions."""
+    program_id, program_name = rows[0][:2]
+    meso_cycles = {}
+    weeks = {}
+    for _, _, meso_cycle_id, start_date, total_weeks, week_id, week_number, week_split, session_id, session_name, day_of_week in rows:
+        if meso_cycle_id is None:
+            continue
+        if meso_cycle_id not in meso_cycles:
+            meso_cycles[meso_cycle_id] = {'id': meso_cycle_id, 'start_date': start_date.isoformat(), 'total_weeks': total_weeks, 'weeks': []}
+        if week_id is None:
+            continue
+        if week_id not in weeks:
+            weeks[week_id] = {
+                'id': week_id,
+                'week_number': week_number,
+                'training_days': [int(day) for day in week_split.split(',') if day],
+                'sessions': []
+            }
+            meso_cycles[meso_cycle_id]['weeks'].append(weeks[week_id])
+        if session_id is not None:
+            weeks[week_id]['sessions'].append({'id': session_id, 'name': session_name, 'day_of_week': day_of_week})
+
+    # The log form works off the first meso cycle & its first week, like the old get_training_weeks & get_training_days endpoints did
+    first = next(iter(meso_cycles.values()), None)
+    training_days = first['weeks'][0]['training_days'] if first and first['weeks'] else []
+    return {
+        'id': program_id,
+        'name': program_name,
+        'total_weeks': first['total_weeks'] if first else 0,
+        'training_days': [(day, get_day_name(day)) for day in training_days],
+        'meso_cycles': list(meso_cycles.values()),
+    }
 
 
 if __name__ == '__main__':
-    print("Creating database and tables if they don't exist...")
     create_db()  # Initialize the database
     app.run(debug=True)  # Start the Flask application
\ No newline at end of file
@@ -0,0 +1,234 @@
+// Client side callbacks of the dashboard, used with DASHBOARD_FILTERING=client (see dashboard.py).
+// The dashboard-data store holds the user's data as tables of columns, e.g. weeks = {id: [...], program: [...], number: [...]},
+// which these filter & sum in the browser the same way the server side callbacks & queries do.
+
+// Default Plotly colors, for templates without a colorway
+const DEFAULT_COLORWAY = ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A', '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52'];
+
+// Lookups built once per dataset rather than on every dropdown change
+const dashboardIndexes = new WeakMap();
+
+// Turn a table of columns into a list of row objects
+function tableRows(table) {
+    const names = Object.keys(table);
+    const length = names.length ? table[names[0]].length : 0;
+    const rows = [];
+    for (let i = 0; i < length; i++) {
+        const row = {};
+        names.forEach(name => row[name] = table[name][i]);
+        rows.push(row);
+    }
+    return rows;
+}
+
+function dashboardIndex(data) {
+    let index = dashboardIndexes.get(data);
+    if (!index) {
+        index = {
+            programs: tableRows(data.programs),
+            weeks: tableRows(data.weeks),
+            sessions: tableRows(data.sessions),
+            totals: tableRows(data.totals),
+            reps: tableRows(data.reps),
+            weekOf: new Map(),  // week id -> week row
+            sessionWeek: new Map(),  // session id -> week id
+            exerciseName: new Map(),  // exercise id -> name
+        };
+        index.weeks.forEach(week => index.weekOf.set(week.id, week));
+        index.sessions.forEach(session => index.sessionWeek.set(session.id, session.week));
+        index.sessionLogs = logCounts(index.totals, row => row.session);
+        index.weekLogs = logCounts(index.totals, row => index.sessionWeek.get(row.session));
+        tableRows(data.exercises).forEach(exercise => index.exerciseName.set(exercise.id, exercise.name));
+        dashboardIndexes.set(data, index);
+    }
+    return index;
+}
+
+// Week number a row was logged in
+function weekNumber(index, row) {
+    const week = index.weekOf.get(index.sessionWeek.get(row.session));
+    return week ? week.number : null;
+}
+
+// How many logs rows hold & the latest date among them, per key
+function logCounts(rows, keyOf) {
+    const counts = new Map();
+    rows.forEach(row => {
+        const key = keyOf(row);
+        const entry = counts.get(key) || {logs: 0, last: ''};
+        entry.logs += row.logs;
+        entry.last = row.last > entry.last ? row.last : entry.last;
+        counts.set(key, entry);
+    });
+    return counts;
+}
+
+// Dropdown label saying how often & when something was last logged, like option_label() in dashboard.py
+function optionLabel(name, counts) {
+    if (!counts || !counts.logs) {
+        return name;
+    }
+    return `${name} (${counts.logs} log${counts.logs === 1 ? '' : 's'}, last ${counts.last})`;
+}
+
+// Rows matching the dropdowns, "All Weeks" & "All Sessions" (or nothing selected) don't filter
+function filterRows(index, rows, programId, weekId, sessionId, exerciseId) {
+    return rows.filter(row =>
+        (!programId || row.program === programId) &&
+        (!weekId || weekId === 'all' || index.sessionWeek.get(row.session) === weekId) &&
+        (!sessionId || sessionId === 'all' || row.session === sessionId) &&
+        (!exerciseId || row.exercise === exerciseId)
+    );
+}
+
+// Sum rows per key, returning [key parts, total] pairs sorted by key
+function sumBy(rows, keyOf, valueOf) {
+    const totals = new Map();
+    rows.forEach(row => {
+        const key = keyOf(row);
+        const id = JSON.stringify(key);
+        const entry = totals.get(id) || {key: key, total: 0};
+        entry.total += valueOf(row) || 0;
+        totals.set(id, entry);
+    });
+    return Array.from(totals.values()).sort((a, b) => {
+        for (let i = 0; i < a.key.length; i++) {
+            if (a.key[i] < b.key[i]) return -1;
+            if (a.key[i] > b.key[i]) return 1;
+        }
+        return 0;
+    });
+}
+
+function emptyFigure(template) {
+    return {data: [], layout: {template: template}};
+}
+
+// Grouped bars of the metric per week number, one trace per exercise, like px.bar(..., color='Exercise', barmode='group')
+function barFigure(index, rows, metric, template) {
+    const label = metric === 'volume' ? 'Total Volume' : 'Total Load';
+    const sums = sumBy(rows, row => [weekNumber(index, row), index.exerciseName.get(row.exercise)], row => row[metric]);
+    const colorway = (template && template.layout && template.layout.colorway) || DEFAULT_COLORWAY;
+
+    const traces = new Map();
+    sums.forEach(({key: [week, exercise], total}) => {
+        if (!traces.has(exercise)) {
+            traces.set(exercise, {
+                type: 'bar', name: exercise, legendgroup: exercise, offsetgroup: exercise, x: [], y: [],
+                marker: {color: colorway[traces.size % colorway.length]},
+                hovertemplate: `Exercise=${exercise}<br>Week Number=%{x}<br>${label}=%{y}<extra></extra>`,
+            });
+        }
+        traces.get(exercise).x.push(week);
+        traces.get(exercise).y.push(total);
+    });
+
+    return {
+        data: Array.from(traces.values()),
+        layout: {
+            template: template,
+            title: {text: `${label} by Exercise Across All Weeks`},
+            barmode: 'group',
+            xaxis: {title: {text: 'Week Number'}},
+            yaxis: {title: {text: label}},
+            legend: {title: {text: 'Exercise'}, tracegroupgap: 0},
+        },
+    };
+}
+
+// A line of reps per set number across weeks, colored by exercise, like px.line(..., color='Exercise', line_group='Set Number')
+function repsFigure(index, rows, template) {
+    const sums = sumBy(rows, row => [weekNumber(index, row), index.exerciseName.get(row.exercise), row.set], row => row.reps);
+    const colorway = (template && template.layout && template.layout.colorway) || DEFAULT_COLORWAY;
+
+    const colors = new Map();  // exercise -> color
+    const traces = new Map();  // [exercise, set] -> trace
+    const inLegend = new Set();
+    sums.forEach(({key: [week, exercise, setNumber], total}) => {
+        if (!colors.has(exercise)) {
+            colors.set(exercise, colorway[colors.size % colorway.length]);
+        }
+        const id = JSON.stringify([exercise, setNumber]);
+        if (!traces.has(id)) {
+            // Only the first line of each exercise goes in the legend
+            const showlegend = !inLegend.has(exercise);
+            inLegend.add(exercise);
+            traces.set(id, {
+                type: 'scatter', mode: 'lines+markers', name: exercise, legendgroup: exercise, showlegend: showlegend, x: [], y: [],
+                line: {color: colors.get(exercise)}, marker: {color: colors.get(exercise)},
+                hovertemplate: `Exercise=${exercise}<br>Set Number=${setNumber}<br>Week Number=%{x}<br>Reps Per Set=%{y}<extra></extra>`,
+            });
+        }
+        traces.get(id).x.push(week);
+        traces.get(id).y.push(total);
+    });
+
+    return {
+        data: Array.from(traces.values()),
+        layout: {
+            template: template,
+            title: {text: 'Reps Per Set by Exercise Across All Weeks'},
+            xaxis: {title: {text: 'Week Number'}},
+            yaxis: {title: {text: 'Reps Per Set'}},
+            legend: {title: {text: 'Exercise'}, tracegroupgap: 0},
+        },
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        programOptions: function (data) {
+            if (!data) {
+                return [];
+            }
+            return dashboardIndex(data).programs.map(program => ({label: program.name, value: program.id}));
+        },
+
+        weekOptions: function (programId, data) {
+            if (programId == null || !data) {
+                return [];
+            }
+            const index = dashboardIndex(data);
+            const weeks = index.weeks.filter(week => week.program === programId);
+            return [{label: 'All Weeks', value: 'all'}].concat(weeks.map(week => ({label: optionLabel(`Week ${week.number}`, index.weekLogs.get(week.id)), value: week.id})));
+        },
+
+        sessionOptions: function (weekId, programId, data) {
+            if (weekId == null || programId == null || !data) {
+                return [];
+            }
+            // "All Weeks" lists sessions across every week of the selected program
+            const index = dashboardIndex(data);
+            const sessions = index.sessions.filter(session => {
+                const week = index.weekOf.get(session.week);
+                return week && week.program === programId && (weekId === 'all' || session.week === weekId);
+            });
+            return [{label: 'All Sessions', value: 'all'}].concat(sessions.map(session => ({label: optionLabel(session.name, index.sessionLogs.get(session.id)), value: session.id})));
+        },
+
+        exerciseOptions: function (sessionId, programId, weekId, data) {
+            if (sessionId == null || !data) {
+                return [];
+            }
+            // Distinct exercises logged in the selected session(s), by name
+            const index = dashboardIndex(data);
+            const counts = logCounts(filterRows(index, index.totals, programId, weekId, sessionId), row => row.exercise);
+            return Array.from(counts.entries())
+                .map(([id, exerciseCounts]) => ({label: optionLabel(index.exerciseName.get(id), exerciseCounts), value: id}))
+                .sort((a, b) => a.label < b.label ? -1 : a.label > b.label ? 1 : 0);
+        },
+
+        figure: function (data, programId, weekId, sessionId, exerciseId, metric, template) {
+            if (!data) {
+                return emptyFigure(template);
+            }
+            const index = dashboardIndex(data);
+            if (metric === 'reps') {
+                const rows = filterRows(index, index.reps, programId, weekId, sessionId, exerciseId);
+                return rows.length ? repsFigure(index, rows, template) : emptyFigure(template);
+            }
+            const rows = filterRows(index, index.totals, programId, weekId, sessionId, exerciseId);
+            return rows.length ? barFigure(index, rows, metric, template) : emptyFigure(template);
+        },
+    },
+});
@@ -0,0 +1,71 @@
+"""
+Bulk import throughput.
+
+    python -m benchmarks.bulk_import [--rows 200000] [--programs 20] [--chunk-rows 5000]
+
+Writes a CSV of `--rows` random logs spread over `--programs` programs, then imports it
+for one user into a fresh SQLite database the way /import & flask import-logs do, and
+reports rows per second along with how many rows were rejected.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from extensions import db
+from importer import import_logs
+from models import User
+from benchmarks.seed import EXERCISES, make_app
+
+COLUMNS = ['program', 'week', 'session', 'day', 'exercise', 'load', 'sets', 'reps', 'rir', 'timestamp']
+
+
+def history_csv(rows, programs, seed=0):
+    """A CSV import file of random logs, about one in a thousand with reps that don't match their sets."""
+    rng = random.Random(seed)
+    start = datetime(2018, 1, 1)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    for i in range(rows):
+        week = i // (programs * 60) + 1
+        day = rng.randint(1, 7)
+        sets = rng.randint(2, 6)
+        reps = [rng.randint(4, 12) for _ in range(sets if rng.random() > 0.001 else sets + 1)]
+        writer.writerow([
+            f'Program {i % programs + 1}', week, f'Day {day}', day, rng.choice(EXERCISES),
+            rng.randint(20, 200), sets, ','.join(map(str, reps)), rng.randint(0, 4),
+            (start + timedelta(weeks=week - 1, days=day - 1, minutes=i % 90)).isoformat(),
+        ])
+    out.seek(0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--programs', type=int, default=20)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = make_app(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "import.db")}')
+    data = history_csv(args.rows, args.programs)
+
+    with app.app_context():
+        db.session.add(User(user_name='importer', hash='x'))
+        db.session.commit()
+        user_id = User.query.filter_by(user_name='importer').one().id
+
+        started = time.perf_counter()
+        result = import_logs(user_id, data, 'csv', chunk_rows=args.chunk_rows)
+        elapsed = time.perf_counter() - started
+
+    print(f"{result.imported} rows imported, {len(result.errors)} rejected in {elapsed:.2f}s "
+          f"({args.rows / elapsed:,.0f} rows/s, {args.chunk_rows} rows per transaction)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Bytes on the wire for a first & a repeat visit of /display & the dashboard it embeds.
+
+    python -m benchmarks.bytes_on_wire [--users 1]
+
+Loads /display, its static files, /dashboard/ with every script & stylesheet its page
+references, the Dash layout & dependencies and the first callbacks, the way a browser
+would, once for each Accept-Encoding: identity (nothing compressed, as before compression
+was added), gzip, and br (when the brotli package is installed). A repeat visit skips
+whatever the first one was told it may cache for a day or more without asking again.
+"""
+import argparse
+import os
+import re
+import tempfile
+
+# Links to scripts & stylesheets on the same server
+LINK = re.compile(r'(?:src|href)="(/[^"]+)"')
+
+
+def dashboard_callbacks():
+    """The callbacks the dashboard page fires on first load, as Dash renderer request bodies."""
+    return [
+        {'output': 'program-dropdown.options', 'outputs': {'id': 'program-dropdown', 'property': 'options'},
+         'inputs': [{'id': 'program-dropdown', 'property': 'value', 'value': None}], 'changedPropIds': []},
+        {'output': 'filtered-graph.figure', 'outputs': {'id': 'filtered-graph', 'property': 'figure'},
+         'inputs': [{'id': dropdown, 'property': 'value', 'value': value} for dropdown, value in (
+             ('program-dropdown', 1), ('week-dropdown', 'all'), ('session-dropdown', 'all'),
+             ('exercise-dropdown', None), ('metric-dropdown', 'volume'))],
+         'changedPropIds': []},
+    ]
+
+
+def visit(client, accept_encoding):
+    """Fetch everything a first visit loads. Returns (url, bytes sent, long lived) per response."""
+    headers = {'Accept-Encoding': accept_encoding}
+    fetched = []
+
+    def get(url):
+        response = client.get(url, headers=headers)
+        if response.status_code == 200:
+            fetched.append((url, len(response.data), (response.cache_control.max_age or 0) >= 24 * 3600))
+        elif response.status_code != 404:  # e.g. a favicon nobody added
+            raise RuntimeError(f"{url} answered {response.status}")
+
+    for page in ('/display', '/dashboard/'):
+        get(page)
+        # Read the links off a plain copy of the page
+        html = client.get(page, headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+        for url in dict.fromkeys(LINK.findall(html)):
+            if url.startswith(('/static/', '/dashboard/')) and url != '/dashboard/':
+                get(url.replace('&amp;', '&'))
+
+    get('/dashboard/_dash-layout')
+    get('/dashboard/_dash-dependencies')
+    for body in dashboard_callbacks():
+        response = client.post('/dashboard/_dash-update-component', json=body, headers=headers)
+        fetched.append((f"callback {body['output']}", len(response.data), False))
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1, help="users to seed, the dashboard shows user 1")
+    args = parser.parse_args()
+
+    # config.py reads these when imported, so they have to be set before the app is
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "wire.db")}'
+    os.environ.setdefault('SECRET_KEY', 'benchmark-bytes-on-wire')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from app import app, create_db
+    from benchmarks.seed import seed
+    from compression import available_encodings
+
+    create_db()
+    with app.app_context():
+        seed(users=args.users)
+
+    client = app.test_client()
+    with client.session_transaction() as client_session:
+        client_session['user_id'] = 1
+
+    encodings = ['identity', 'gzip'] + (['br'] if 'br' in available_encodings() else [])
+    visits = {encoding: visit(client, encoding) for encoding in encodings}
+
+    print(f"{'response':<72} " + ' '.join(f"{encoding:>10}" for encoding in encodings))
+    for i, (url, _, _) in enumerate(visits['identity']):
+        print(f"{url[:72]:<72} " + ' '.join(f"{visits[encoding][i][1]:>10,}" for encoding in encodings))
+
+    for label, repeat in (('first visit', False), ('repeat visit', True)):
+        totals = [sum(size for _, size, long_lived in visits[encoding] if not (repeat and long_lived)) for encoding in encodings]
+        print(f"{label:<72} " + ' '.join(f"{total:>10,}" for total in totals))
+    if 'br' not in encodings:
+        print("\nInstall the brotli package to compare br too.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Concurrent writers & dashboard readers against one SQLite database.
+
+    python -m benchmarks.concurrency [--writers 4] [--readers 4] [--seconds 10] [--journal-mode WAL]
+
+Writer threads save 10 exercise submissions the way /submit-log does (one transaction
+each), reader threads run the dashboard volume & reps queries. Run it once with
+--journal-mode DELETE (SQLite's default) and once with WAL to compare.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from config import sqlite_pragmas
+from extensions import db
+from queries import weekly_exercise_summary, weekly_reps_per_set
+from services import insert_logs
+from benchmarks.seed import make_app, seed
+
+EXERCISES_PER_SUBMISSION = 10
+
+
+def percentile(timings, fraction):
+    return sorted(timings)[int(len(timings) * fraction)] * 1000 if timings else float('nan')
+
+
+def writer(app, users, deadline, results):
+    rng = random.Random()
+    with app.app_context():
+        while time.monotonic() < deadline:
+            user_id = rng.randint(1, users)
+            program_id = user_id * 2  # seed gives user n programs 2n - 1 & 2n
+            reps = [[rng.randint(4, 12) for _ in range(3)] for _ in range(EXERCISES_PER_SUBMISSION)]
+            logs = [{
+                'user_id': user_id, 'program_id': program_id, 'mesocycle_id': program_id,
+                'exercise_id': rng.randint(1, 18), 'training_session_id': None, 'training_week_id': None,
+                'load': rng.randint(20, 200), 'sets': 3, 'reps': ','.join(map(str, log_reps)),
+                'rir': 2, 'timestamp': datetime.utcnow(),
+            } for log_reps in reps]
+
+            started = time.perf_counter()
+            try:
+                insert_logs(logs, reps)
+                db.session.commit()
+                results['write'].append(time.perf_counter() - started)
+            except OperationalError:
+                db.session.rollback()
+                results['write errors'] += 1
+
+
+def reader(app, users, deadline, results):
+    rng = random.Random()
+    with app.app_context():
+        while time.monotonic() < deadline:
+            user_id = rng.randint(1, users)
+            started = time.perf_counter()
+            try:
+                weekly_exercise_summary(user_id, user_id * 2)
+                weekly_reps_per_set(user_id, user_id * 2)
+                results['read'].append(time.perf_counter() - started)
+            except OperationalError:
+                results['read errors'] += 1
+            db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--journal-mode', default='WAL')
+    parser.add_argument('--synchronous', default='NORMAL')
+    parser.add_argument('--busy-timeout-ms', type=int, default=5000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = make_app(f'sqlite:///{path}', SQLITE_PRAGMAS=sqlite_pragmas(args.journal_mode, args.synchronous, args.busy_timeout_ms))
+    with app.app_context():
+        seed(users=args.users)
+
+    results = {'write': [], 'read': [], 'write errors': 0, 'read errors': 0}
+    deadline = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=writer, args=(app, args.users, deadline, results)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(app, args.users, deadline, results)) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"journal_mode={args.journal_mode} synchronous={args.synchronous} "
+          f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    for kind in ('write', 'read'):
+        timings = results[kind]
+        print(f"{kind}s: {len(timings) / args.seconds:.1f}/s  p50 {percentile(timings, 0.5):.1f} ms  "
+              f"p99 {percentile(timings, 0.99):.1f} ms  errors {results[kind + ' errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Import time & memory of the app, with & without the dashboard.
+
+    python -m benchmarks.import_time [--top 10] [--check]
+
+Imports each module in a fresh interpreter under python -X importtime and reports the
+total import time, peak RSS and its slowest direct imports. --check exits non zero
+when importing app pulls in any of the dashboard's heavy dependencies, so a stray
+top level import of Dash, Plotly or pandas can be caught in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+HEAVY = ('dash', 'plotly', 'pandas', 'numpy')
+
+# Imported after startup so it doesn't count towards the import time
+REPORT = "import resource, sys; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, *sorted(m for m in sys.modules if '.' not in m))"
+
+
+def profile(module):
+    """(import seconds, peak RSS in MB, loaded top level modules, {direct import: cumulative seconds}) of importing module."""
+    env = dict(os.environ, SECRET_KEY=os.environ.get('SECRET_KEY', 'import-time'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}; {REPORT}'],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+    # Lines look like "import time:       123 |       4567 |   package", indented by nesting depth.
+    # A module's line comes after those of everything it imported.
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, us, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(us) / 1e6
+        elif depth == 0:
+            if name.strip() == module:
+                seconds = int(us) / 1e6
+                break
+            children = {}
+
+    maxrss_kb, *modules = result.stdout.split()
+    return seconds, int(maxrss_kb) / 1024, set(modules), children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--check', action='store_true', help="fail when app imports the dashboard's dependencies")
+    args = parser.parse_args()
+
+    heavy_in_app = set()
+    for module in ('app', 'dashboard'):
+        seconds, rss_mb, modules, children = profile(module)
+        heavy = sorted(modules.intersection(HEAVY))
+        if module == 'app':
+            heavy_in_app.update(heavy)
+
+        print(f"import {module}: {seconds:.2f}s, {rss_mb:.0f} MB peak RSS, heavy modules: {', '.join(heavy) or 'none'}")
+        for name, seconds in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {seconds:6.3f}s  {name}")
+
+    if args.check and heavy_in_app:
+        print(f"app imports {', '.join(sorted(heavy_in_app))} at startup")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
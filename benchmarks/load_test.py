@@ -0,0 +1,214 @@
+"""
+Load test: requests per second & latency of the hot routes from a real server, run the way it's deployed.
+
+    python -m benchmarks.load_test [--serve gunicorn|flask] [--url URL] [--clients 16] [--seconds 10]
+
+--serve starts the app on a throwaway database, under gunicorn with gunicorn.conf.py (override
+its workers & threads with GUNICORN_WORKERS & GUNICORN_THREADS) or under `flask run` to compare
+against. --url tests a server that's already running instead, as a newly registered loadtest user.
+
+Each scenario gets --seconds of --clients threads requesting it as fast as the server answers:
+GET /display, POST /submit-log and the dashboard's load_weeks & update_graph callbacks.
+Reports requests per second, p50 & p99 latency and failed requests per scenario.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+# Weeks the submitted logs are spread over
+WEEKS = 4
+
+
+class NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Report a redirect (how most forms answer) as its status, rather than following it."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def request(opener, url, form=None, body=None):
+    """Make a request, returning (status, response body). Forms are sent url encoded & bodies as JSON."""
+    data, headers = None, {}
+    if form is not None:
+        data = urllib.parse.urlencode(form, doseq=True).encode()
+    elif body is not None:
+        data, headers = json.dumps(body).encode(), {'Content-Type': 'application/json'}
+    try:
+        with opener.open(urllib.request.Request(url, data, headers), timeout=60) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, b''
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def callback(output, inputs, state=()):
+    """A Dash renderer request body for a callback, inputs & state as (component id, value) pairs."""
+    component, prop = output.split('.')
+    return {
+        'output': output, 'outputs': {'id': component, 'property': prop},
+        'inputs': [{'id': id, 'property': 'value', 'value': value} for id, value in inputs],
+        'state': [{'id': id, 'property': 'value', 'value': value} for id, value in state],
+        'changedPropIds': [f'{inputs[0][0]}.value'],
+    }
+
+
+def submission(program_id, i):
+    return {
+        'program_id': program_id, 'week_number': i % WEEKS + 1, 'session_day': 1, 'session_name': 'Load test',
+        'exercise_name[]': ['Squat', 'Bench Press', 'Barbell Row'], 'load[]': [100, 80, 60],
+        'sets[]': [3, 3, 2], 'rir[]': [2, 2, 1],
+        'reps[0][]': [5, 5, 5], 'reps[1][]': [8, 8, 6], 'reps[2][]': [10, 10],
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve(server):
+    """Start the app under gunicorn or flask run on a throwaway database. Returns (process, base URL, log file)."""
+    directory = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "load.db")}'
+    env.setdefault('SECRET_KEY', 'load-test')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env.setdefault('GUNICORN_ACCESS_LOG', '')
+
+    if server == 'gunicorn':
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            sys.exit("gunicorn isn't installed, pip install -r requirements.txt (or use --serve flask)")
+        # gunicorn.conf.py creates the database before starting the workers
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'app:app']
+    else:
+        subprocess.run([sys.executable, '-c', 'from app import create_db; create_db()'], env=env, check=True)
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--with-threads']
+
+    log = open(os.path.join(directory, 'server.log'), 'w')
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base = f'http://127.0.0.1:{port}'
+
+    # Wait for it to answer
+    for _ in range(300):
+        if process.poll() is not None:
+            sys.exit(f"The server exited, see {log.name}")
+        try:
+            urllib.request.urlopen(f'{base}/login', timeout=1).read()
+            return process, base, log.name
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit(f"The server didn't start within 30 seconds, see {log.name}")
+
+
+def setup(base):
+    """Register & log in a new user with a program & a few weeks of logs. Returns (opener, program id)."""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirects)
+    username = f'loadtest-{uuid.uuid4().hex[:8]}'
+    request(opener, f'{base}/register', {'username': username, 'password': username, 'confirmation': username})
+    request(opener, f'{base}/login', {'username': username, 'password': username})
+    program_name = f'Load test {username}'
+    status, _ = request(opener, f'{base}/create_program', {
+        'program_name': program_name, 'start_date': time.strftime('%Y-%m-%d'), 'weeks': WEEKS, 'training_days[]': [1, 3, 5],
+    })
+    if status >= 400:
+        sys.exit(f"Couldn't create a program, /create_program answered {status}")
+
+    # The dropdown also lists shared programs (those without an owner), so find the new one by its name
+    status, body = request(opener, f'{base}/dashboard/_dash-update-component',
+                           body=callback('program-dropdown.options', [('program-dropdown', None)]))
+    if status != 200:
+        sys.exit(f"The dashboard answered {status}, is it off (DASHBOARD=off) or filtering client side?")
+    options = json.loads(body)['response']['program-dropdown']['options']
+    program_id = next((option['value'] for option in options if option['label'] == program_name), None)
+    if program_id is None:
+        sys.exit(f"The program just created, {program_name!r}, isn't among the user's programs")
+
+    for i in range(WEEKS * 5):
+        request(opener, f'{base}/submit-log', submission(program_id, i))
+    return opener, program_id
+
+
+def run(opener, send, clients, seconds):
+    """Call send(opener, i) from `clients` threads for `seconds`. Returns (latencies in ms, failures)."""
+    stop = time.perf_counter() + seconds
+    latencies = []
+    failures = []
+    counter = iter(range(10 ** 9))
+
+    def client():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            status = send(opener, next(counter))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                failures.append(status)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--serve', choices=('gunicorn', 'flask'), default='gunicorn')
+    parser.add_argument('--url', help="test this running server instead, e.g. http://localhost:4000")
+    parser.add_argument('--clients', type=int, default=16, help="threads sending requests concurrently")
+    parser.add_argument('--seconds', type=float, default=10, help="per scenario")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        base = args.url.rstrip('/')
+    else:
+        process, base, _ = serve(args.serve)
+
+    try:
+        opener, program_id = setup(base)
+        dash = f'{base}/dashboard/_dash-update-component'
+        scenarios = {
+            'GET /display': lambda opener, i: request(opener, f'{base}/display')[0],
+            'POST /submit-log': lambda opener, i: request(opener, f'{base}/submit-log', submission(program_id, i))[0],
+            'load_weeks': lambda opener, i: request(opener, dash, body=callback(
+                'week-dropdown.options', [('program-dropdown', program_id)]))[0],
+            'update_graph': lambda opener, i: request(opener, dash, body=callback('filtered-graph.figure', [
+                ('program-dropdown', program_id), ('week-dropdown', 'all'), ('session-dropdown', 'all'),
+                ('exercise-dropdown', None), ('metric-dropdown', ('volume', 'load', 'reps')[i % 3])]))[0],
+        }
+
+        print(f"{args.url or args.serve}, {args.clients} clients, {args.seconds:g}s per scenario")
+        print(f"{'scenario':<20} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+        for name, send in scenarios.items():
+            latencies, failures = run(opener, send, args.clients, args.seconds)
+            print(f"{name:<20} {len(latencies) / args.seconds:>8.1f} {percentile(latencies, 50):>8.1f} "
+                  f"{percentile(latencies, 99):>8.1f} {len(failures):>7}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
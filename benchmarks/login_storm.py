@@ -0,0 +1,91 @@
+"""
+Login storm: how the rest of the app holds up while many users sign in at once.
+
+    python -m benchmarks.login_storm [--logins 8] [--seconds 10] [--hash-workers 2] [--iterations 600000]
+
+Serves the real app (on a throwaway database) from a threaded server, then hammers
+/login from `--logins` threads while one more thread keeps requesting /. Reports the
+login throughput and the latency of / during the storm. Run it with --hash-workers 0
+to compare against hashing on the request threads.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def post(url, form):
+    try:
+        with urllib.request.urlopen(url, urllib.parse.urlencode(form).encode()) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=8, help="threads logging in concurrently")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=600000)
+    args = parser.parse_args()
+
+    # config.py reads these when imported, so they have to be set before the app is
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "storm.db")}'
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.hash_workers)
+    os.environ['PASSWORD_HASH_ITERATIONS'] = str(args.iterations)
+    os.environ['PASSWORD_HASH_QUEUE'] = str(max(args.logins, 1))
+    os.environ.setdefault('SECRET_KEY', 'login-storm')
+
+    from werkzeug.serving import make_server
+    from app import app, create_db
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    create_db()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    post(f'{base}/register', {'username': 'storm', 'password': 'storm', 'confirmation': 'storm'})
+
+    stop = time.perf_counter() + args.seconds
+    statuses = []
+    latencies = []
+
+    def login():
+        while time.perf_counter() < stop:
+            statuses.append(post(f'{base}/login', {'username': 'storm', 'password': 'storm'}))
+
+    def probe():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            urllib.request.urlopen(f'{base}/').read()
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login) for _ in range(args.logins)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    ok = sum(1 for status in statuses if status < 400)
+    print(f"hash workers {args.hash_workers}, {args.iterations} iterations, {args.logins} concurrent logins")
+    print(f"logins: {ok / args.seconds:.1f}/s ok, {len(statuses) - ok} turned away")
+    print(f"GET /: p50 {percentile(latencies, 50):.1f} ms, p99 {percentile(latencies, 99):.1f} ms over {len(latencies)} requests")
+
+
+if __name__ == '__main__':
+    main()
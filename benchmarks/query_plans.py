@@ -0,0 +1,93 @@
+"""
+Query plans & timings of the hot queries with and without the model indexes.
+
+    python -m benchmarks.query_plans [--users 50]
+
+Seeds a throwaway SQLite database, then runs each query first with every declared
+index dropped & again after recreating them, printing SQLite's EXPLAIN QUERY PLAN.
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event, text
+from extensions import db
+from models import Exercise, Log, TrainingSession, TrainingWeek
+from queries import logs_page, weekly_exercise_summary, weekly_reps_per_set
+from benchmarks.seed import make_app, seed
+
+# Timed runs per query, the median is reported
+RUNS = 5
+
+QUERIES = {
+    'display page': lambda: logs_page(user_id=1),
+    'dashboard volume': lambda: weekly_exercise_summary(user_id=1, program_id=1),
+    'dashboard reps': lambda: weekly_reps_per_set(user_id=1, program_id=1, week_id='all'),
+    'exercise dropdown': lambda: db.session.query(Exercise.exercise_name, Exercise.id)
+        .join(Log, Log.exercise_id == Exercise.id).filter(Log.training_session_id == 1).all(),
+    'weeks of meso cycle': lambda: TrainingWeek.query.filter_by(meso_cycle_id=1, week_number=2).first(),
+    'sessions of week': lambda: TrainingSession.query.filter_by(training_week_id=1).all(),
+}
+
+
+def declared_indexes():
+    return [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+
+def capture_statements(f):
+    """Run f & return the (statement, parameters) of every SELECT it issued."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        f()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def report(label):
+    print(f"\n===== {label} =====")
+    for name, f in QUERIES.items():
+        timings = []
+        for _ in range(RUNS):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            f()
+            timings.append(time.perf_counter() - started)
+        print(f"\n{name}: {sorted(timings)[RUNS // 2] * 1000:.2f} ms")
+
+        for statement, parameters in capture_statements(f):
+            plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = make_app(f'sqlite:///{path}')
+    with app.app_context():
+        logs = seed(users=args.users)
+        print(f"Seeded {logs} logs into {path}")
+
+        for index in declared_indexes():
+            index.drop(db.engine)
+        db.session.execute(text('ANALYZE'))
+        report('without indexes')
+
+        for index in declared_indexes():
+            index.create(db.engine)
+        db.session.execute(text('ANALYZE'))
+        report('with indexes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import insert
+from config import Config, engine_options
+from extensions import db, init_db
+from migrations import run_migrations
+from rollups import rebuild_weekly_volume
+from models import User, Exercise, Log, LogSet, Program, MesoCycle, TrainingWeek, TrainingSession
+
+
+# Seeded synthetic training data for the benchmarks. Rows are bulk inserted straight
+# into the model tables, ids are assigned here so nothing has to be read back.
+
+# Logs inserted per round of bulk inserts
+SEED_BATCH = 50000
+
+EXERCISES = [
+    'Squat', 'Bench Press', 'Deadlift', 'Overhead Press', 'Barbell Row', 'Pull Up', 'Dip',
+    'Romanian Deadlift', 'Leg Press', 'Lunge', 'Incline Bench Press', 'Lat Pulldown',
+    'Cable Row', 'Lateral Raise', 'Bicep Curl', 'Tricep Extension', 'Calf Raise', 'Face Pull',
+]
+
+
+def make_app(database_uri, **config):
+    """A bare Flask app bound to its own database, so benchmarks never touch app.db. config overrides Config."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_uri)
+    app.config.update(config)
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+    return app
+
+
+def seed(users=10, programs_per_user=2, mesocycles_per_program=1, weeks=8, sessions_per_week=3, exercises_per_session=5, seed=0):
+    """
+    Fill the database (inside an app context) with a reproducible training history.
+
+    Every user gets their own programs, each with `mesocycles_per_program` meso cycles of
+    `weeks` weeks, `sessions_per_week` sessions per week & `exercises_per_session` logs per
+    session with 2 to 6 sets each. Rows are inserted SEED_BATCH logs at a time so millions
+    of logs fit in memory, and the weekly volume rollup is rebuilt at the end.
+    Returns the number of logs created.
+    """
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 6)
+
+    db.session.execute(insert(Exercise), [
+        {'id': i, 'exercise_name': name} for i, name in enumerate(EXERCISES, 1)
+    ])
+    db.session.execute(insert(User), [
+        {'id': user_id, 'user_name': f'user{user_id}', 'hash': 'x'} for user_id in range(1, users + 1)
+    ])
+
+    rows = {model: [] for model in (Program, MesoCycle, TrainingWeek, TrainingSession, Log, LogSet)}
+    ids = dict.fromkeys(rows, 0)
+
+    def add(model, row):
+        ids[model] += 1
+        rows[model].append({'id': ids[model], **row})
+        return ids[model]
+
+    def flush():
+        # Parents first, so every foreign key points at a row that's already there
+        for model, batch in rows.items():
+            if batch:
+                db.session.execute(insert(model), batch)
+                batch.clear()
+
+    for user_id in range(1, users + 1):
+        for _ in range(programs_per_user):
+            program_id = add(Program, {'name': f'Program {ids[Program] + 1}', 'user_id': user_id})
+            program_start = start + timedelta(weeks=weeks * mesocycles_per_program * (program_id - 1) / users)
+            exercise_ids = rng.sample(range(1, len(EXERCISES) + 1), exercises_per_session)
+
+            for meso_number in range(mesocycles_per_program):
+                meso_start = program_start + timedelta(weeks=weeks * meso_number)
+                meso_cycle_id = add(MesoCycle, {'program_id': program_id, 'total_weeks': weeks, 'start_date': meso_start.date()})
+                split = ','.join(str(day) for day in sorted(rng.sample(range(1, 8), sessions_per_week)))
+
+                for week_number in range(1, weeks + 1):
+                    week_id = add(TrainingWeek, {'meso_cycle_id': meso_cycle_id, 'week_number': week_number, 'week_split': split})
+
+                    for day in split.split(','):
+                        session_id = add(TrainingSession, {'training_week_id': week_id, 'name': f'Day {day}', 'day_of_week': int(day)})
+                        timestamp = meso_start + timedelta(weeks=week_number - 1, days=int(day) - 1)
+
+                        for exercise_id in exercise_ids:
+                            reps = [rng.randint(4, 12) for _ in range(rng.randint(2, 6))]
+                            log_id = add(Log, {
+                                'user_id': user_id, 'program_id': program_id, 'mesocycle_id': meso_cycle_id,
+                                'exercise_id': exercise_id, 'training_session_id': session_id,
+                                'training_week_id': week_id, 'load': rng.randint(20, 200), 'sets': len(reps),
+                                'reps': ','.join(map(str, reps)), 'rir': rng.randint(0, 4),
+                                'timestamp': timestamp + timedelta(minutes=ids[Log] % 90),
+                            })
+                            for set_number, rep in enumerate(reps, 1):
+                                add(LogSet, {'log_id': log_id, 'set_number': set_number, 'reps': rep})
+
+            if len(rows[Log]) >= SEED_BATCH:
+                flush()
+
+    flush()
+    rebuild_weekly_volume(db.session.connection())
+    db.session.commit()
+    return ids[Log]
@@ -0,0 +1,88 @@
+"""
+Per request overhead of login_required for each session backend.
+
+    python -m benchmarks.session_backends [--requests 2000] [--redis-url fakeredis://]
+
+Times a logged in client hitting a route behind login_required against the same
+route in a bare app without sessions, so the difference is the cost of loading
+(& saving) the session on every request.
+"""
+import argparse
+import os
+import tempfile
+import time
+from flask import Flask, session
+from config import Config
+from extensions import db, init_db
+from sessions import SESSION_BACKENDS, init_sessions, login_required
+
+
+def make_app(backend, directory, redis_url):
+    app = Flask(__name__, instance_path=directory)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{os.path.join(directory, "sessions.db")}',
+        SESSION_BACKEND=backend,
+        SESSION_REDIS_URL=redis_url,
+        SESSION_FILE_DIR=os.path.join(directory, 'flask_session'),
+    )
+    init_db(app)
+    init_sessions(app)
+    with app.app_context():
+        db.create_all()
+
+    @app.route('/login')
+    def login():
+        session['user_id'] = 1
+        return 'ok'
+
+    @app.route('/protected')
+    @login_required
+    def protected():
+        return 'ok'
+
+    return app
+
+
+def make_bare_app():
+    app = Flask(__name__)
+
+    @app.route('/protected')
+    def protected():
+        return 'ok'
+
+    return app
+
+
+def time_requests(client, path, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--redis-url', default='fakeredis://')
+    args = parser.parse_args()
+
+    baseline_us = time_requests(make_bare_app().test_client(), '/protected', args.requests)
+    print(f"{'none':>10}: {baseline_us:7.1f} us per request")
+
+    for backend in SESSION_BACKENDS:
+        try:
+            app = make_app(backend, tempfile.mkdtemp(), args.redis_url)
+        except ImportError as e:
+            print(f"{backend:>10}: skipped, {e}")
+            continue
+
+        client = app.test_client()
+        client.get('/login')
+        protected_us = time_requests(client, '/protected', args.requests)
+        print(f"{backend:>10}: {protected_us:7.1f} us per request, "
+              f"{protected_us - baseline_us:7.1f} us of which is the session")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Exercise
+
+
+# Most exercises a worker keeps in memory, least recently used are dropped first
+EXERCISE_CACHE_SIZE = 2048
+
+# Most dashboard figures a worker keeps in memory & how long each may be served for (seconds)
+FIGURE_CACHE_SIZE = 256
+FIGURE_CACHE_TTL = 60
+
+
+class ExerciseCatalog:
+    """
+    Bounded in-process cache of exercise name <-> id.
+
+    Exercises are only ever added, never renamed or deleted, so an entry can't go stale.
+    Another worker's new exercises are simply cache misses here & are read from the
+    database, which makes it safe to run one catalog per worker process. Ids inserted
+    by this worker are only cached once their transaction commits.
+    """
+
+    def __init__(self, maxsize=EXERCISE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()  # name -> id, in least recently used order
+        self._names = {}  # id -> name
+        self._lock = threading.Lock()
+
+    def lookup_ids(self, names):
+        """Map names to ids, reading misses from the database with one IN query. Unknown names are left out."""
+        found, missing = self._get(self._ids, set(names))
+        if missing:
+            rows = db.session.query(Exercise.exercise_name, Exercise.id).filter(Exercise.exercise_name.in_(missing)).all()
+            found.update(rows)
+            self.remember(rows)
+        return found
+
+    def lookup_names(self, ids):
+        """Map ids to names, reading misses from the database with one IN query. Unknown ids are left out."""
+        found, missing = self._get(self._names, set(ids))
+        if missing:
+            rows = db.session.query(Exercise.id, Exercise.exercise_name).filter(Exercise.id.in_(missing)).all()
+            found.update(rows)
+            self.remember((name, exercise_id) for exercise_id, name in rows)
+        return found
+
+    def remember(self, pairs):
+        """Cache committed (name, id) pairs."""
+        with self._lock:
+            for name, exercise_id in pairs:
+                self._ids[name] = exercise_id
+                self._ids.move_to_end(name)
+                self._names[exercise_id] = name
+            while len(self._ids) > self.maxsize:
+                _, exercise_id = self._ids.popitem(last=False)
+                self._names.pop(exercise_id, None)
+
+    def remember_after_commit(self, session, pairs):
+        """Cache (name, id) pairs inserted by session once it commits, forget them if it rolls back."""
+        session.info.setdefault('new_exercises', []).extend(pairs)
+
+    def invalidate(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+    def _get(self, mapping, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in mapping:
+                    found[key] = mapping[key]
+                    name = key if mapping is self._ids else mapping[key]
+                    self._ids.move_to_end(name)
+        return found, keys - found.keys()
+
+
+class FigureCache:
+    """
+    Bounded in-process LRU cache of dashboard figures.
+
+    Keys are (user_id, program_id, week_id, session_id, exercise_id, metric). Other per user
+    results drawn from the logs (the dropdown options, the client side dashboard's dataset,
+    time series) are kept alongside under a metric of their own.
+    Writes invalidate the figures of the programs they touch once they commit.
+    Other workers can't see those invalidations, so entries also expire after `ttl`
+    seconds, which bounds how stale a figure served by another worker can be.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE, ttl=FIGURE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._figures = OrderedDict()  # key -> (expires_at, figure), in least recently used order
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        """The cached figure for key, or None."""
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._figures.pop(key, None)
+                self.misses += 1
+                return None
+            self._figures.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_or_build(self, key, build):
+        """The cached value for key, or what build() returns, which is cached for next time."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def put(self, key, figure):
+        with self._lock:
+            self._figures[key] = (time.monotonic() + self.ttl, figure)
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_programs(self, program_ids):
+        """Drop every figure that includes data from one of the programs, i.e. those of that program or of all programs."""
+        program_ids = {str(program_id) for program_id in program_ids}
+        with self._lock:
+            stale = [key for key in self._figures if not key[1] or str(key[1]) in program_ids]
+            for key in stale:
+                del self._figures[key]
+            self.invalidations += len(stale)
+
+    def invalidate_programs_after_commit(self, session, program_ids):
+        """Invalidate the programs' figures once session commits."""
+        session.info.setdefault('changed_programs', set()).update(program_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self.invalidations += len(self._figures)
+            self._figures.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._figures),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+exercise_catalog = ExerciseCatalog()
+figure_cache = FigureCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_committed_changes(session):
+    exercise_catalog.remember(session.info.pop('new_exercises', []))
+    figure_cache.invalidate_programs(session.info.pop('changed_programs', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_uncommitted_changes(session):
+    session.info.pop('new_exercises', None)
+    session.info.pop('changed_programs', None)
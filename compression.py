@@ -0,0 +1,160 @@
+import functools
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from flask import request
+from werkzeug.security import safe_join
+
+
+# Content types worth compressing, anything else (images, Parquet, ...) already is or won't shrink
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+# Brotli quality for responses compressed on every request, 4 beats gzip -6 on size at similar speed
+BROTLI_QUALITY = 4
+
+# Responses cached for at least this long (fingerprinted static files & Dash bundles) are compressed
+# once at the highest level & their compressed copies kept, up to PRECOMPRESSED_CACHE_SIZE per worker
+LONG_LIVED_MAX_AGE = 24 * 3600
+PRECOMPRESSED_CACHE_SIZE = 64
+
+# How long browsers may keep fingerprinted static files without asking again
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@functools.lru_cache(maxsize=None)
+def available_encodings():
+    """Content encodings this process can produce, best first. Brotli needs the brotli package installed."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return ('gzip',)
+    return ('br', 'gzip')
+
+
+def negotiate_encoding(accept_encodings):
+    """The encoding to answer a request's Accept-Encoding with, or None when it accepts none we have."""
+    encoding = max(available_encodings(), key=lambda encoding: accept_encodings[encoding])
+    return encoding if accept_encodings[encoding] > 0 else None
+
+
+def compress(data, encoding, level, best=False):
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    # No timestamp in the header, so the same body always compresses to the same bytes
+    return gzip.compress(data, compresslevel=9 if best else level, mtime=0)
+
+
+class PrecompressedCache:
+    """Bounded LRU of compressed bodies of long lived responses, keyed by (URL, encoding)."""
+
+    def __init__(self, maxsize=PRECOMPRESSED_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, key, data, encoding, level):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+        body = compress(data, encoding, level, best=True)
+        with self._lock:
+            self._bodies[key] = body
+            while len(self._bodies) > self.maxsize:
+                self._bodies.popitem(last=False)
+        return body
+
+
+precompressed = PrecompressedCache()
+
+
+def init_compression(app):
+    """
+    Compress responses with brotli or gzip for clients that accept it, as configured by COMPRESS_MIN_BYTES
+    & COMPRESS_LEVEL. Streamed responses (the history stream, exports) are left alone.
+    """
+    min_bytes = app.config['COMPRESS_MIN_BYTES']
+    level = app.config['COMPRESS_LEVEL']
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or 'Content-Encoding' in response.headers or response.cache_control.no_transform:
+            return response
+        if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        if response.direct_passthrough:
+            # Files sent from disk, e.g. static files, can be read in whole when their size is known
+            if response.content_length is None:
+                return response
+            response.direct_passthrough = False
+        elif response.is_streamed:
+            return response
+
+        size = response.content_length if response.content_length is not None else len(response.get_data())
+        if size < min_bytes:
+            return response
+
+        # Caches in between must keep the compressed & plain responses apart
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if (response.cache_control.max_age or 0) >= LONG_LIVED_MAX_AGE:
+            body = precompressed.get_or_compress((request.full_path, encoding), response.get_data(), encoding, level)
+        else:
+            body = compress(response.get_data(), encoding, level)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+
+        # The bytes differ from the plain response's, so its ETag only matches weakly now
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def init_static_fingerprints(app):
+    """
+    Add ?v=<hash of the file's content> to every url_for('static', ...) URL, and let browsers cache
+    files requested with their current hash for a year without revalidating. Editing a file changes
+    its URL, so nobody gets a stale copy. Call after init_compression, so the files are compressed once.
+    """
+    versions = {}  # filename -> (modification time, hash)
+    lock = threading.Lock()
+
+    def static_version(filename):
+        path = safe_join(app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        modified = os.path.getmtime(path)
+        with lock:
+            version = versions.get(filename)
+        if version is None or version[0] != modified:
+            with open(path, 'rb') as f:
+                version = (modified, hashlib.md5(f.read()).hexdigest()[:12])
+            with lock:
+                versions[filename] = version
+        return version[1]
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            version = static_version(values['filename'])
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def cache_versioned_static(response):
+        if request.endpoint == 'static' and response.status_code == 200 and request.args.get('v'):
+            if request.args['v'] == static_version(request.view_args['filename']):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = IMMUTABLE_MAX_AGE
+                response.cache_control.immutable = True
+        return response
@@ -0,0 +1,110 @@
+import os
+from datetime import timedelta
+
+
+# Everything that differs between environments is read from environment variables,
+# so e.g. pointing the app at Postgres is DATABASE_URL=postgresql://... without code changes.
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///app.db')  # Relative SQLite paths live in the instance folder
+
+# Connection pool, per worker process
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+
+# SQLite only. WAL lets readers carry on while a writer commits, and with synchronous=NORMAL
+# a commit no longer fsyncs, a power loss can only lose the last few commits, never corrupt.
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait this long for a lock instead of "database is locked"
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+
+# Sessions, see sessions.py for the backends
+SECRET_KEY = os.environ.get('SECRET_KEY')  # Generated & kept in the instance folder when not set
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie')
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+SESSION_LIFETIME_HOURS = int(os.environ.get('SESSION_LIFETIME_HOURS', 24 * 7))  # Server side sessions expire after this
+
+# The dashboard (see dashboard.py) is mounted under /dashboard/ on first use (lazy), at startup (eager),
+# or not at all (off) when it's served by worker processes of its own
+DASHBOARD = os.environ.get('DASHBOARD', 'lazy')
+# server runs a callback per dropdown change, client sends each user's summarized logs once per page
+# & filters & draws in the browser, which suits histories of up to a few thousand sessions
+DASHBOARD_FILTERING = os.environ.get('DASHBOARD_FILTERING', 'server')
+
+# Instrumentation, see instrumentation.py
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))  # Requests slower than this are logged (& profiled)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))  # SQL statements slower than this are logged
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', '')  # cprofile or pyinstrument to keep profiles of slow requests, empty for off
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')  # Where profiles are written, the instance folder's profiles folder by default
+
+# Response compression, see compression.py
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 500))  # Smaller responses go out as they are, 0 compresses everything
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip level, 1 (fastest) to 9 (smallest)
+
+# Password hashing, see passwords.py
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))  # PBKDF2 work factor for new hashes
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Hashing processes per worker, 0 hashes on the request thread
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # Hashes allowed to wait for the pool at once
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))  # Seconds before a login/registration gives up
+
+
+def engine_options(database_uri, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database."""
+    if database_uri.startswith('sqlite'):
+        options = {'connect_args': {'timeout': busy_timeout_ms / 1000, 'check_same_thread': False}}
+        # In memory databases use a single connection per thread, which takes no pool sizing
+        if ':memory:' not in database_uri and database_uri.rstrip('/') != 'sqlite:':
+            options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': True,  # Survive the server closing idle connections
+        'pool_recycle': 1800,
+    }
+
+
+def sqlite_pragmas(journal_mode=SQLITE_JOURNAL_MODE, synchronous=SQLITE_SYNCHRONOUS, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS):
+    """PRAGMAs applied to every new SQLite connection, in order."""
+    return {
+        'journal_mode': journal_mode,
+        'synchronous': synchronous,
+        'busy_timeout': busy_timeout_ms,
+        'cache_size': -SQLITE_CACHE_SIZE_KB,  # Negative means KiB rather than pages
+        'temp_store': 'MEMORY',
+        'mmap_size': SQLITE_MMAP_SIZE,
+    }
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = DATABASE_URL
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(DATABASE_URL)
+    SQLITE_PRAGMAS = sqlite_pragmas()
+
+    SECRET_KEY = SECRET_KEY
+    SESSION_BACKEND = SESSION_BACKEND
+    SESSION_REDIS_URL = SESSION_REDIS_URL
+    SESSION_PERMANENT = False
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=SESSION_LIFETIME_HOURS)
+    SESSION_CLEANUP_N_REQUESTS = 1000  # sqlalchemy backend, sweep expired sessions about once every N requests
+    SESSION_FILE_THRESHOLD = 1000  # filesystem backend, prune the oldest files beyond this many
+    SESSION_COOKIE_HTTPONLY = True
+    SESSION_COOKIE_SAMESITE = 'Lax'
+
+    DASHBOARD = DASHBOARD
+    DASHBOARD_FILTERING = DASHBOARD_FILTERING
+
+    LOG_LEVEL = LOG_LEVEL
+    SLOW_REQUEST_MS = SLOW_REQUEST_MS
+    SLOW_QUERY_MS = SLOW_QUERY_MS
+    PROFILE_REQUESTS = PROFILE_REQUESTS
+    PROFILE_DIR = PROFILE_DIR
+
+    COMPRESS_MIN_BYTES = COMPRESS_MIN_BYTES
+    COMPRESS_LEVEL = COMPRESS_LEVEL
@@ -0,0 +1,373 @@
+import logging
+from flask import Flask, session
+from dash import Dash, dcc, html
+from dash.dependencies import ClientsideFunction, Input, Output, State
+import plotly.express as px
+import plotly.graph_objects as go
+import pandas as pd
+from models import Program
+from extensions import init_db
+from config import Config
+from sessions import init_sessions
+from instrumentation import init_instrumentation, timed
+from compression import init_compression
+from cache import exercise_catalog, figure_cache
+from queries import (exercise_options, session_exercise_summary, session_options, session_reps_per_set, user_hierarchy,
+                     user_programs, week_options, weekly_exercise_summary, weekly_reps_per_set)
+
+
+# The Dash dashboard runs as its own small Flask server, so Dash, Plotly & pandas are only
+# imported by processes that actually serve it. app.py mounts it under /dashboard/ on first
+# use, or it can run in a worker pool of its own, e.g. gunicorn "dashboard:create_dashboard()".
+
+logger = logging.getLogger(__name__)
+
+
+def create_dashboard(app=None):
+    """
+    Flask server hosting the dashboard under /dashboard/.
+
+    Given the main app it shares that app's config & session interface, so the logged in
+    user carries over. Without one it's configured from Config like the main app is.
+    """
+    server = Flask(__name__)
+    if app is not None:
+        server.config.update(app.config)
+        init_db(server)
+        server.session_interface = app.session_interface
+    else:
+        server.config.from_object(Config)
+        init_db(server)
+        init_sessions(server)
+    init_instrumentation(server)
+    # Dash's own compress option needs flask-compress, this covers its bundles, layout & callbacks the same way
+    init_compression(server)
+
+    dash_app = Dash(__name__, server=server, url_base_pathname='/dashboard/')
+    if server.config['DASHBOARD_FILTERING'] == 'client':
+        dash_app.layout = html.Div([
+            dcc.Location(id='dashboard-url'),
+            dcc.Store(id='dashboard-data'),
+            # Plotly's default template, so the figures drawn in the browser look like the Plotly Express ones
+            dcc.Store(id='dashboard-template', data=go.Figure().layout.template.to_plotly_json()),
+            layout
+        ])
+        register_client_callbacks(dash_app)
+    else:
+        dash_app.layout = layout
+        register_server_callbacks(dash_app)
+    return server
+
+
+### Dash Layout ###
+
+# Define the layout for Dash
+# Dash layout with 4 dropdowns
+layout = html.Div([
+    # Program Dropdown
+    dcc.Dropdown(
+        id='program-dropdown',
+        placeholder="Select a Program",
+        style={'width': '50%'}
+    ),
+    # Week Dropdown
+    dcc.Dropdown(
+        id='week-dropdown',
+        placeholder="Select a Week",
+        style={'width': '50%'}
+    ),
+    # Session Dropdown
+    dcc.Dropdown(
+        id='session-dropdown',
+        placeholder="Select a Session",
+        style={'width': '50%'}
+    ),
+    # Exercise Dropdown
+    dcc.Dropdown(
+        id='exercise-dropdown',
+        placeholder="Select an Exercise",
+        style={'width': '50%'}
+    ),
+    # Metric Dropdown
+    dcc.Dropdown(
+        id='metric-dropdown',
+        options=[
+        {'label': 'Volume', 'value': 'volume'},
+        {'label': 'Load over Time', 'value': 'load'},
+        {'label': 'Reps over Time', 'value': 'reps'}
+        ],
+        value='volume',  # Default value
+        clearable=False
+    ),
+
+    # Placeholder for graph
+    dcc.Graph(id='filtered-graph')
+])
+
+### Dash Callbacks ###
+# Every callback is scoped to the logged in user, so its cost grows with their data rather than everyone's
+
+def register_server_callbacks(dash_app):
+    """Filter & draw on the server, with a callback per dropdown change."""
+    dash_app.callback(
+        Output('program-dropdown', 'options'),
+        Input('program-dropdown', 'value')
+    )(load_programs)
+
+    dash_app.callback(
+        Output('week-dropdown', 'options'),
+        Input('program-dropdown', 'value')  # Triggered when a program is selected
+    )(load_weeks)
+
+    dash_app.callback(
+        Output('session-dropdown', 'options'),
+        Input('week-dropdown', 'value'),  # Triggered when a week is selected
+        State('program-dropdown', 'value')
+    )(load_sessions)
+
+    dash_app.callback(
+        Output('exercise-dropdown', 'options'),
+        Input('session-dropdown', 'value'),  # Triggered when a session is selected
+        State('program-dropdown', 'value'),
+        State('week-dropdown', 'value')
+    )(load_exercises)
+
+    dash_app.callback(
+        Output('filtered-graph', 'figure'),
+        [Input('program-dropdown', 'value'),
+        Input('week-dropdown', 'value'),
+        Input('session-dropdown', 'value'),
+        Input('exercise-dropdown', 'value'),
+        Input('metric-dropdown', 'value')]  # Metric selection
+    )(update_graph)
+
+
+def register_client_callbacks(dash_app):
+    """
+    Fetch the user's dataset once per page, then filter & draw in the browser with the
+    clientside functions of assets/dashboard.js, so dropdown changes never reach the server.
+    """
+    dash_app.callback(
+        Output('dashboard-data', 'data'),
+        Input('dashboard-url', 'pathname')  # Triggered once, when the page loads
+    )(load_dataset)
+
+    dash_app.clientside_callback(
+        ClientsideFunction('dashboard', 'programOptions'),
+        Output('program-dropdown', 'options'),
+        Input('dashboard-data', 'data')
+    )
+
+    dash_app.clientside_callback(
+        ClientsideFunction('dashboard', 'weekOptions'),
+        Output('week-dropdown', 'options'),
+        Input('program-dropdown', 'value'),
+        State('dashboard-data', 'data')
+    )
+
+    dash_app.clientside_callback(
+        ClientsideFunction('dashboard', 'sessionOptions'),
+        Output('session-dropdown', 'options'),
+        Input('week-dropdown', 'value'),
+        State('program-dropdown', 'value'),
+        State('dashboard-data', 'data')
+    )
+
+    dash_app.clientside_callback(
+        ClientsideFunction('dashboard', 'exerciseOptions'),
+        Output('exercise-dropdown', 'options'),
+        Input('session-dropdown', 'value'),
+        State('program-dropdown', 'value'),
+        State('week-dropdown', 'value'),
+        State('dashboard-data', 'data')
+    )
+
+    dash_app.clientside_callback(
+        ClientsideFunction('dashboard', 'figure'),
+        Output('filtered-graph', 'figure'),
+        Input('dashboard-data', 'data'),
+        Input('program-dropdown', 'value'),
+        Input('week-dropdown', 'value'),
+        Input('session-dropdown', 'value'),
+        Input('exercise-dropdown', 'value'),
+        Input('metric-dropdown', 'value'),
+        State('dashboard-template', 'data')
+    )
+
+
+@timed
+def load_programs(_):
+    user_id = session.get('user_id')
+    if user_id is None:
+        return []
+    programs = user_programs(user_id).all()
+    return [{'label': program.name, 'value': program.id} for program in programs]
+
+
+@timed
+def load_weeks(program_id):
+    user_id = session.get('user_id')
+    if program_id is None or user_id is None:
+        return []
+    weeks = figure_cache.get_or_build((user_id, program_id, None, None, None, 'week options'), lambda: week_options(user_id, program_id))
+    options = [{'label': option_label(f'Week {week_number}', log_count, last_logged), 'value': week_id} for week_id, week_number, log_count, last_logged in weeks]
+    # Add "All Weeks" option
+    options.insert(0, {'label': 'All Weeks', 'value': 'all'})
+    return options
+
+
+@timed
+def load_sessions(week_id, program_id):
+    user_id = session.get('user_id')
+    if week_id is None or program_id is None or user_id is None:
+        return []
+    # "All Weeks" fetches sessions across every week of the selected program
+    sessions = figure_cache.get_or_build((user_id, program_id, week_id, None, None, 'session options'), lambda: session_options(user_id, program_id, week_id))
+
+    # Add the "All Sessions" option at the start of the dropdown
+    options = [{'label': 'All Sessions', 'value': 'all'}] + [
+        {'label': option_label(name, log_count, last_logged), 'value': session_id} for session_id, name, log_count, last_logged in sessions
+    ]
+
+    return options
+
+
+@timed
+def load_exercises(session_id, program_id=None, week_id=None):
+    user_id = session.get('user_id')
+    if session_id is None or user_id is None:
+        return []
+    # One row per distinct exercise however often it was logged, names come from the exercise catalog cache
+    exercises = figure_cache.get_or_build((user_id, program_id, week_id, session_id, None, 'exercise options'), lambda: exercise_options(user_id, program_id, week_id, session_id))
+    names = exercise_catalog.lookup_names([exercise_id for exercise_id, _, _ in exercises])
+
+    options = [{'label': option_label(names[exercise_id], log_count, last_logged), 'value': exercise_id} for exercise_id, log_count, last_logged in exercises]
+    return sorted(options, key=lambda option: option['label'])
+
+
+@timed
+def update_graph(program_id, week_id, session_id, exercise_id, metric):
+    user_id = session.get('user_id')
+    if user_id is None:
+        return go.Figure()
+
+    # Serve a figure this worker already built for the same filters, submit_log invalidates them
+    key = (user_id, program_id, week_id, session_id, exercise_id, metric)
+    fig = figure_cache.get(key)
+    if fig is None:
+        fig = build_graph(user_id, program_id, week_id, session_id, exercise_id, metric)
+        if fig is not None:
+            figure_cache.put(key, fig)
+    return fig
+
+
+@timed
+def load_dataset(_):
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+
+    # Kept under an "all programs" key, so any new log drops it
+    return figure_cache.get_or_build((user_id, None, None, None, None, 'dataset'), lambda: build_dataset(user_id))
+
+
+def option_label(name, log_count, last_logged):
+    """Dropdown label saying how often & when something was last logged, e.g. 'Squat (12 logs, last 2024-05-01)'."""
+    if not log_count:
+        return name
+    return f"{name} ({log_count} log{'' if log_count == 1 else 's'}, last {last_logged:%Y-%m-%d})"
+
+
+def build_dataset(user_id):
+    """
+    Everything the client side dashboard can show a user, as tables of equally long column lists:
+    their programs, weeks & sessions, the names of their exercises, and totals per session & exercise
+    (plus reps per set) to filter & sum in the browser.
+    """
+    programs = user_programs(user_id).with_entities(Program.id, Program.name).order_by(Program.id).all()
+    weeks, sessions = user_hierarchy(user_id)
+    # Last logged dates as YYYY-MM-DD strings, which the browser compares as they are
+    totals = [(*row[:-1], f"{row[-1]:%Y-%m-%d}") for row in session_exercise_summary(user_id)]
+    reps = session_reps_per_set(user_id)
+    names = exercise_catalog.lookup_names({row[2] for row in totals} | {row[2] for row in reps})
+
+    return {
+        'programs': column_lists(programs, ['id', 'name']),
+        'weeks': column_lists(weeks, ['id', 'program', 'number']),
+        'sessions': column_lists(sessions, ['id', 'week', 'name']),
+        'exercises': column_lists(sorted(names.items()), ['id', 'name']),
+        'totals': column_lists(totals, ['program', 'session', 'exercise', 'volume', 'load', 'logs', 'last']),
+        'reps': column_lists(reps, ['program', 'session', 'exercise', 'set', 'reps']),
+    }
+
+
+def column_lists(rows, names):
+    """Rows as a dict of column lists, e.g. [(1, 'a'), (2, 'b')] -> {'id': [1, 2], 'name': ['a', 'b']}."""
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def summary_frame(rows, columns):
+    """
+    Columnar DataFrame of summarized rows whose 'Exercise' column holds exercise ids.
+    The ids are swapped for their names & the rows sorted by week, exercise (& set) in vectorized passes.
+    """
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    names = exercise_catalog.lookup_names(df['Exercise'].unique().tolist())
+    df['Exercise'] = df['Exercise'].map(names)
+    return df.sort_values([column for column in ('Week Number', 'Exercise', 'Set Number') if column in columns], ignore_index=True)
+
+
+def build_graph(user_id, program_id, week_id, session_id, exercise_id, metric):
+
+    # Create figures based on selected metric
+    if metric in ('volume', 'load'):
+        # Volume & load are summed per Week Number and Exercise by the database
+        rows = weekly_exercise_summary(user_id, program_id, week_id, session_id, exercise_id)
+        if not rows:
+            # Return an empty figure with no data if no logs are found
+            return go.Figure()
+
+        week_summary = summary_frame(rows, ['Week Number', 'Exercise', 'Volume', 'Load'])
+        # Debugging step to verify the week summary, only formatted when debug logging is on
+        logger.debug("Week summary:\n%s", week_summary)
+
+    if metric == 'volume':
+        # Create a bar chart to display Volume by Exercise across all weeks
+        fig = px.bar(week_summary, 
+                x='Week Number', 
+                y='Volume', 
+                color='Exercise',  # Differentiate each exercise by color
+                title='Total Volume by Exercise Across All Weeks',
+                barmode='group',
+                labels={'Volume': 'Total Volume', 'Week Number': 'Week Number'})
+        return fig
+
+    if metric == 'load':
+        # Create a bar chart to display Load by Exercise across all weeks
+        fig = px.bar(week_summary, 
+                x='Week Number', 
+                y='Load', 
+                color='Exercise',  # Differentiate each exercise by color
+                title='Total Load by Exercise Across All Weeks',
+                barmode='group',  # Group bars by Week and Exercise
+                labels={'Load': 'Total Load', 'Week Number': 'Week Number'})
+        return fig
+
+    if metric == 'reps':
+        # Reps per set are summed per Week, Exercise and Set Number by the database
+        rows = weekly_reps_per_set(user_id, program_id, week_id, session_id, exercise_id)
+        if not rows:
+            return go.Figure()
+
+        week_summary_reps = summary_frame(rows, ['Week Number', 'Exercise', 'Set Number', 'Reps'])
+
+        # Create a line chart to display Reps per Set across weeks
+        fig = px.line(week_summary_reps,
+                    x='Week Number', 
+                    y='Reps', 
+                    color='Exercise',  # Differentiate each exercise by color
+                    line_group='Set Number',  # Differentiate lines by set number within each exercise
+                    title='Reps Per Set by Exercise Across All Weeks',
+                    labels={'Reps': 'Reps Per Set', 'Week Number': 'Week Number', 'Set Number': 'Set Number'},
+                    markers=True)  # Optionally add markers to see each point
+        return fig
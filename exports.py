@@ -0,0 +1,128 @@
+import csv
+import io
+from extensions import db
+from queries import history_export
+
+
+# Exports stream a user's history straight from a server side cursor, EXPORT_CHUNK_ROWS
+# rows at a time, so memory stays flat however long the history is.
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+class ExportUnavailable(Exception):
+    """Raised when an export format needs an optional package that isn't installed."""
+
+
+def history_chunks(user_id):
+    """(column names, iterator over lists of up to EXPORT_CHUNK_ROWS rows) of a user's history export."""
+    result = db.session.execute(history_export(user_id).execution_options(yield_per=EXPORT_CHUNK_ROWS))
+    return list(result.keys()), result.partitions()
+
+
+def export_history(user_id, fmt):
+    """
+    Generator of the bytes of a user's history export in the given format (a key of EXPORT_FORMATS).
+    Raises ExportUnavailable right away, before anything is streamed, when the format's optional package is missing.
+    """
+    if fmt != 'csv':
+        import_pyarrow()
+    writers = {'csv': csv_export, 'parquet': parquet_export, 'arrow': arrow_export}
+    return writers[fmt](user_id)
+
+
+def csv_export(user_id):
+    columns, chunks = history_chunks(user_id)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there's no history
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def parquet_export(user_id):
+    pa, pq = import_pyarrow()
+    sink = ChunkSink()
+    columns, chunks = history_chunks(user_id)
+    # Every chunk becomes a row group, written out as soon as it's full
+    with pq.ParquetWriter(sink, history_schema(pa)) as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=history_schema(pa)))
+            yield sink.take()
+    yield sink.take()
+
+
+def arrow_export(user_id):
+    pa, _ = import_pyarrow()
+    sink = ChunkSink()
+    columns, chunks = history_chunks(user_id)
+    with pa.ipc.new_stream(sink, history_schema(pa)) as writer:
+        for rows in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist([dict(zip(columns, row)) for row in rows], schema=history_schema(pa)))
+            yield sink.take()
+    yield sink.take()
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailable("Parquet & Arrow exports need the pyarrow package installed.")
+    return pyarrow, pyarrow.parquet
+
+
+def history_schema(pa):
+    """Arrow schema of history_export's columns."""
+    return pa.schema([
+        ('log_id', pa.int64()),
+        ('timestamp', pa.timestamp('us')),
+        ('program', pa.string()),
+        ('week', pa.int64()),
+        ('session', pa.string()),
+        ('exercise', pa.string()),
+        ('sets', pa.int64()),
+        ('set_number', pa.int64()),
+        ('reps', pa.int64()),
+        ('load', pa.int64()),
+        ('rir', pa.int64()),
+    ])
+
+
+class ChunkSink:
+    """Write only file object collecting what pyarrow writes, so it can be handed out a chunk at a time."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
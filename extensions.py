@@ -1,3 +1,21 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def init_db(app):
+    """Bind db to the app, applying the app's SQLITE_PRAGMAS to every new SQLite connection."""
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if engine.dialect.name == 'sqlite' and pragmas:
+        @event.listens_for(engine, 'connect')
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+            cursor.close()
@@ -0,0 +1,53 @@
+# Production serving with gunicorn, e.g. in the container:
+#
+#     gunicorn --config gunicorn.conf.py app:app
+#
+# The app is imported once in the master process & the database created/migrated there before
+# any worker is forked, so workers start instantly & share the imported code copy on write.
+# Everything can be overridden from the environment, like config.py.
+#
+# Graceful restarts: kill -HUP <master> starts fresh workers & lets the old ones finish their
+# requests, but as the app is preloaded they run the code the master imported. To deploy new
+# code without dropping requests, kill -USR2 <master> (starts a new master with the new code),
+# then kill -QUIT the old master once the new one is serving.
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 4000)}")
+
+# Worker processes x threads per worker. Workers default to 2 per core + 1, the usual mix for an
+# app that's mostly waiting on its database. Threads stay within DB_POOL_SIZE + DB_MAX_OVERFLOW,
+# and every worker also starts PASSWORD_HASH_WORKERS hashing processes on its first login.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+preload_app = True
+
+# Import the dashboard (Dash, Plotly & pandas) in the master too, rather than in every worker on first use
+os.environ.setdefault('DASHBOARD', 'eager')
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))  # Workers silent for longer are killed & replaced
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))  # Time to finish requests on restart / shutdown
+keepalive = 5
+
+# Replace workers now & then, so a slow leak can't grow forever. The jitter stops them all restarting at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None  # Empty turns it off
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'INFO').lower()
+
+
+def when_ready(server):
+    """Create & migrate the database once, in the master, before any worker exists."""
+    from app import app, create_db
+    from extensions import db
+
+    create_db()
+    # Workers must not inherit the master's connections, each opens its own
+    with app.app_context():
+        db.engine.dispose()
+    server.log.info("Database ready, starting %d workers x %d threads", workers, threads)
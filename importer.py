@@ -0,0 +1,266 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import MesoCycle, Program, TrainingSession, TrainingWeek
+from queries import user_programs
+from services import insert_logs, insert_returning_ids, resolve_exercise_ids
+
+
+# Bulk import of historical logs, e.g. from a spreadsheet. One row per log:
+#   program, week, session, day, exercise, load, sets, reps, rir, timestamp
+# where reps holds one count per set ("10,8,8" in CSV, [10, 8, 8] in JSON lines), day is
+# the session's day of the week (1 for Monday) & day / session / timestamp are optional.
+# Programs, weeks & sessions that don't exist yet are created, like submit_log does.
+#
+# Rows are validated one by one, then resolved & inserted IMPORT_CHUNK_ROWS at a time,
+# each chunk in its own transaction. Bad rows are reported & skipped, the rest still land.
+IMPORT_CHUNK_ROWS = 5000
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict) from a text stream of CSV (with a header row) or JSON lines."""
+    if fmt == 'csv':
+        # Row 1 is the header
+        for row_number, row in enumerate(csv.DictReader(stream), 2):
+            yield row_number, row
+    else:
+        for row_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError:
+                yield row_number, None
+
+
+def parse_row(row):
+    """Validate an input row into a log entry dict. Raises ValueError with a readable message."""
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+
+    program = str(row.get('program') or '').strip()
+    exercise = str(row.get('exercise') or '').strip()
+    if not program:
+        raise ValueError("program is required")
+    if not exercise:
+        raise ValueError("exercise is required")
+
+    week = parse_int(row, 'week', minimum=1)
+    load = parse_int(row, 'load', minimum=0)
+    sets = parse_int(row, 'sets', minimum=1)
+    rir = parse_int(row, 'rir', minimum=0)
+
+    reps = row.get('reps')
+    if isinstance(reps, str):
+        reps = [rep for rep in reps.replace(';', ',').split(',') if rep.strip()]
+    if not isinstance(reps, list):
+        raise ValueError("reps must be a list of counts, one per set")
+    try:
+        reps = [int(rep) for rep in reps]
+    except (TypeError, ValueError):
+        raise ValueError("reps must be whole numbers")
+    if any(rep < 0 for rep in reps):
+        raise ValueError("reps can't be negative")
+    if len(reps) != sets:
+        raise ValueError(f"{len(reps)} reps given for {sets} sets")
+
+    timestamp = row.get('timestamp')
+    if timestamp:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp))
+        except ValueError:
+            raise ValueError(f"timestamp {timestamp!r} isn't an ISO date/time")
+    else:
+        timestamp = None
+
+    day = parse_int(row, 'day', minimum=1, maximum=7) if row.get('day') not in (None, '') else None
+    if day is None:
+        day = timestamp.isoweekday() if timestamp else 1
+
+    return {
+        'program': program,
+        'week': week,
+        'session': str(row.get('session') or '').strip() or f"Session for Day {day}",
+        'day': day,
+        'exercise': exercise,
+        'load': load,
+        'sets': sets,
+        'reps': reps,
+        'rir': rir,
+        'timestamp': timestamp,
+    }
+
+
+def parse_int(row, column, minimum=None, maximum=None):
+    value = row.get(column)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{column} must be a whole number, not {value!r}")
+    if minimum is not None and value < minimum or maximum is not None and value > maximum:
+        raise ValueError(f"{column} {value} is out of range")
+    return value
+
+
+class Importer:
+    """
+    Imports rows for one user. Program, week & session ids resolved by earlier chunks are
+    kept so later chunks don't look them up again.
+    """
+
+    def __init__(self, user_id, chunk_rows=IMPORT_CHUNK_ROWS):
+        self.user_id = user_id
+        self.chunk_rows = chunk_rows
+        self.imported = 0
+        self.errors = []  # (row number, message)
+        self._programs = {}  # name -> (program id, meso cycle id)
+        self._weeks = {}  # (meso cycle id, week number) -> week id
+        self._splits = {}  # meso cycle id -> week split of its first week
+        self._sessions = {}  # (week id, session name) -> session id
+
+    def run(self, rows):
+        """Import (row number, dict) pairs. Returns self, with imported & errors filled in."""
+        chunk = []
+        for row_number, row in rows:
+            try:
+                chunk.append((row_number, parse_row(row)))
+            except ValueError as e:
+                self.errors.append((row_number, str(e)))
+            if len(chunk) >= self.chunk_rows:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self
+
+    def import_chunk(self, chunk):
+        """Resolve & insert a chunk of parsed rows in one transaction."""
+        entries = [entry for _, entry in chunk]
+        try:
+            self.resolve_structure(entries)
+            exercise_ids = resolve_exercise_ids(entry['exercise'] for entry in entries)
+
+            now = datetime.utcnow()
+            logs = []
+            for entry in entries:
+                program_id, meso_cycle_id = self._programs[entry['program']]
+                week_id = self._weeks[meso_cycle_id, entry['week']]
+                logs.append({
+                    'user_id': self.user_id,
+                    'program_id': program_id,
+                    'mesocycle_id': meso_cycle_id,
+                    'exercise_id': exercise_ids[entry['exercise']],
+                    'training_session_id': self._sessions[week_id, entry['session']],
+                    'training_week_id': week_id,
+                    'load': entry['load'],
+                    'sets': entry['sets'],
+                    'reps': ','.join(str(rep) for rep in entry['reps']),
+                    'rir': entry['rir'],
+                    'timestamp': entry['timestamp'] or now,
+                })
+
+            insert_logs(logs, [entry['reps'] for entry in entries])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            # Whatever the chunk created is gone with it
+            self._programs.clear()
+            self._weeks.clear()
+            self._splits.clear()
+            self._sessions.clear()
+            self.errors.extend((row_number, f"not imported, {getattr(e, 'orig', None) or e}") for row_number, _ in chunk)
+            return
+
+        self.imported += len(entries)
+
+    def resolve_structure(self, entries):
+        """Fill in the ids of every program, week & session the entries use, creating the missing ones. Doesn't commit."""
+        # Programs, matched by name among those the user can see
+        names = {entry['program'] for entry in entries} - self._programs.keys()
+        if names:
+            found = {}
+            for program in user_programs(self.user_id).filter(Program.name.in_(names)).order_by(Program.id.desc()):
+                found[program.name] = program.id  # Lowest id wins when names repeat
+            meso_cycles = {}
+            if found:
+                for meso_cycle in MesoCycle.query.filter(MesoCycle.program_id.in_(found.values())).order_by(MesoCycle.id.desc()):
+                    meso_cycles[meso_cycle.program_id] = meso_cycle.id
+
+            for name in names:
+                rows = [entry for entry in entries if entry['program'] == name]
+                program_id = found.get(name)
+                if program_id is None:
+                    program = Program(name=name, user_id=self.user_id)
+                    db.session.add(program)
+                    db.session.flush()
+                    program_id = program.id
+                if program_id not in meso_cycles:
+                    dates = [entry['timestamp'].date() for entry in rows if entry['timestamp']]
+                    meso_cycle = MesoCycle(
+                        program_id=program_id,
+                        start_date=min(dates) if dates else datetime.utcnow().date(),
+                        total_weeks=max(entry['week'] for entry in rows)
+                    )
+                    db.session.add(meso_cycle)
+                    db.session.flush()
+                    meso_cycles[program_id] = meso_cycle.id
+                self._programs[name] = (program_id, meso_cycles[program_id])
+
+        # Weeks, one query for all the meso cycles involved
+        wanted = {(self._programs[entry['program']][1], entry['week']) for entry in entries} - self._weeks.keys()
+        if wanted:
+            meso_cycle_ids = {meso_cycle_id for meso_cycle_id, _ in wanted}
+            for week in TrainingWeek.query.filter(TrainingWeek.meso_cycle_id.in_(meso_cycle_ids)).order_by(TrainingWeek.id.desc()):
+                self._weeks[week.meso_cycle_id, week.week_number] = week.id
+                if week.week_number == 1 or week.meso_cycle_id not in self._splits:
+                    self._splits[week.meso_cycle_id] = week.week_split
+
+            missing = sorted(wanted - self._weeks.keys())
+            if missing:
+                new_weeks = []
+                for meso_cycle_id, week_number in missing:
+                    # New weeks share the program's split, or the days the import trains on
+                    split = self._splits.get(meso_cycle_id) or ','.join(str(day) for day in sorted({
+                        entry['day'] for entry in entries if self._programs[entry['program']][1] == meso_cycle_id
+                    }))
+                    self._splits[meso_cycle_id] = split
+                    new_weeks.append({'meso_cycle_id': meso_cycle_id, 'week_number': week_number, 'week_split': split})
+                self._weeks.update(zip(missing, insert_returning_ids(TrainingWeek, new_weeks)))
+
+                # Meso cycles grow to cover the weeks imported into them
+                for meso_cycle in MesoCycle.query.filter(MesoCycle.id.in_({meso_cycle_id for meso_cycle_id, _ in missing})):
+                    meso_cycle.total_weeks = max(meso_cycle.total_weeks, *(week_number for meso_cycle_id, week_number in missing if meso_cycle_id == meso_cycle.id))
+
+        # Sessions, matched by name within their week
+        days = {}
+        for entry in entries:
+            days.setdefault((self._weeks[self._programs[entry['program']][1], entry['week']], entry['session']), entry['day'])
+        wanted = days.keys() - self._sessions.keys()
+        if wanted:
+            week_ids = {week_id for week_id, _ in wanted}
+            for training_session in TrainingSession.query.filter(TrainingSession.training_week_id.in_(week_ids)).order_by(TrainingSession.id.desc()):
+                self._sessions[training_session.training_week_id, training_session.name] = training_session.id
+
+            missing = sorted(wanted - self._sessions.keys())
+            if missing:
+                new_ids = insert_returning_ids(TrainingSession, [
+                    {'training_week_id': week_id, 'name': name, 'day_of_week': days[week_id, name]} for week_id, name in missing
+                ])
+                self._sessions.update(zip(missing, new_ids))
+
+
+def import_logs(user_id, stream, fmt, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import a text stream of CSV or JSON lines (see IMPORT_FORMATS) for a user. Returns the finished Importer."""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Import format must be one of {', '.join(IMPORT_FORMATS)}.")
+    return Importer(user_id, chunk_rows).run(read_rows(stream, fmt))
+
+
+def text_stream(binary):
+    """Wrap an uploaded binary file for read_rows, tolerating a UTF-8 byte order mark."""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
@@ -0,0 +1,248 @@
+import cProfile
+import logging
+import os
+import threading
+import time
+import weakref
+from functools import wraps
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metrics:
+    """
+    Minimal in-process registry of counters, gauges & histograms, rendered in the Prometheus text format.
+    Every worker process keeps its own, so scrape each worker (or sum them in Prometheus).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}  # name -> (type, help)
+        self._values = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, name, help, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ('counter', help))
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, help, value, kind='gauge', **labels):
+        """Set a gauge, or with kind='counter' publish a counter something else keeps count of."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, (kind, help))
+            self._values[key] = value
+
+    def observe(self, name, help, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ('histogram', help))
+            histogram = self._histograms.setdefault(key, [0] * len(BUCKETS) + [0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self):
+        """Everything recorded so far in the Prometheus text exposition format."""
+        with self._lock:
+            values = sorted(self._values.items())
+            histograms = sorted((key, list(histogram)) for key, histogram in self._histograms.items())
+            helps = dict(self._help)
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                kind, help = helps[name]
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in values:
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            for bound, count in zip(BUCKETS, histogram):
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram[-1]}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram[-2]}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+metrics = Metrics()
+
+# Held by the request being profiled, see start_profiler
+_profiler_lock = threading.Lock()
+
+# Engines already hooked up, each app (& the dashboard server) has its own
+_instrumented_engines = weakref.WeakSet()
+
+
+def init_instrumentation(app):
+    """
+    Time every request of the app along with the SQL it runs, log slow requests & queries, and
+    optionally profile requests, as configured by LOG_LEVEL, SLOW_REQUEST_MS, SLOW_QUERY_MS & PROFILE_REQUESTS.
+    Call after init_db.
+    """
+    logging.basicConfig(level=app.config['LOG_LEVEL'], format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    with app.app_context():
+        instrument_engine(db.engine, app.config['SLOW_QUERY_MS'] / 1000)
+
+    slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+    profiler = app.config['PROFILE_REQUESTS']
+    profile_dir = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+
+    @app.before_request
+    def start_request_timer():
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+        g.profiler = start_profiler(profiler)
+        g.request_started = g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+
+        metrics.observe('http_request_duration_seconds', "Time spent handling requests.", elapsed,
+                        method=request.method, endpoint=endpoint, status=response.status_code)
+        metrics.observe('http_request_sql_seconds', "Time spent in SQL per request.", g.sql_seconds, endpoint=endpoint)
+        metrics.inc('http_request_sql_statements_total', "SQL statements run by requests.", g.sql_statements, endpoint=endpoint)
+
+        if elapsed >= slow_request:
+            logger.warning("Slow request %s %s: %.0f ms, %d SQL statements taking %.0f ms",
+                           request.method, request.path, elapsed * 1000, g.sql_statements, g.sql_seconds * 1000)
+
+        # Streamed responses keep running after this, only the time to the first byte is counted
+        response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}, db;dur={g.sql_seconds * 1000:.1f}'
+        return response
+
+    @app.teardown_request
+    def stop_request_profiler(exception):
+        # Here rather than in after_request, which is skipped when a view raises & would leave the profiler running
+        profile = g.pop('profiler', None)
+        if profile is not None:
+            elapsed = time.perf_counter() - g.profile_started
+            save_profile(profile, profiler, profile_dir, request.endpoint or 'unmatched', elapsed, slow_request)
+
+
+def instrument_engine(engine, slow_query):
+    """Count & time every statement the engine runs, per request & overall, logging those slower than slow_query seconds."""
+    if engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics.inc('db_statements_total', "SQL statements executed.")
+        metrics.inc('db_statement_seconds_total', "Time spent executing SQL statements.", elapsed)
+
+        if has_request_context() and 'sql_statements' in g:
+            g.sql_statements += 1
+            g.sql_seconds += elapsed
+
+        if elapsed >= slow_query:
+            metrics.inc('db_slow_statements_total', "SQL statements slower than SLOW_QUERY_MS.")
+            logger.warning("Slow query (%.0f ms): %s", elapsed * 1000, ' '.join(statement.split())[:1000])
+
+    @event.listens_for(engine, 'handle_error')
+    def forget_failed_query(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def timed(f):
+    """Decorate a Dash callback to record how long it takes, under its function name."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            metrics.observe('dash_callback_duration_seconds', "Time spent in Dash callbacks.",
+                            time.perf_counter() - started, callback=f.__name__)
+
+    return decorated_function
+
+
+def start_profiler(profiler):
+    """
+    A running profiler of the requested kind ('cprofile' or 'pyinstrument'), or None when profiling is off
+    or another request of this process is being profiled already.
+    """
+    if profiler not in ('cprofile', 'pyinstrument'):
+        return None
+    # Only one profiler can run in a process at a time (Python 3.12 raises for a second cProfile),
+    # so requests overlapping a profiled one go unprofiled
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    try:
+        if profiler == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("PROFILE_REQUESTS=pyinstrument needs the pyinstrument package installed")
+            _profiler_lock.release()
+            return None
+        profile = Profiler()
+        profile.start()
+        return profile
+    except Exception:
+        _profiler_lock.release()
+        raise
+
+
+def save_profile(profile, profiler, profile_dir, endpoint, elapsed, slow_request):
+    """Stop the request's profiler, keeping its output in profile_dir when the request was slow."""
+    try:
+        if profiler == 'cprofile':
+            profile.disable()
+        else:
+            profile.stop()
+    finally:
+        _profiler_lock.release()
+    if elapsed < slow_request:
+        return
+
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.replace('/', '_')}-{elapsed * 1000:.0f}ms")
+    if profiler == 'cprofile':
+        profile.dump_stats(path + '.prof')  # Open with python -m pstats or snakeviz
+    else:
+        with open(path + '.html', 'w') as f:
+            f.write(profile.output_html())
+    logger.info("Saved profile of slow request to %s", path)
@@ -0,0 +1,113 @@
+import logging
+from sqlalchemy import insert, inspect, text
+from extensions import db
+from models import Log, LogSet, MesoCycle, Program, TrainingSession, TrainingWeek
+from rollups import rebuild_weekly_volume
+
+
+# db.create_all() only creates missing tables, so anything that has to touch existing
+# rows or tables is registered here as a numbered migration & applied once per database.
+MIGRATIONS = []
+
+# Rows handled per round trip when backfilling
+BATCH_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+
+def migration(version):
+    """Register a function as the migration for the given schema version."""
+
+    def register(f):
+        MIGRATIONS.append((version, f))
+        return f
+
+    return register
+
+
+def run_migrations():
+    """Apply every registered migration that has not been applied to this database yet."""
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY)"))
+        applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+    for version, f in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        logger.info("Applying migration %s: %s", version, f.__name__)
+        # Each migration runs in its own transaction together with its version bookkeeping
+        with db.engine.begin() as connection:
+            f(connection)
+            connection.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+
+
+def create_index(connection, model, name):
+    """Create one of the indexes declared on a model, unless the database already has it."""
+    index = next(index for index in model.__table__.indexes if index.name == name)
+    index.create(connection, checkfirst=True)
+
+
+def split_reps(reps_csv):
+    """Turn a legacy reps CSV string such as '10,8,8' into a list of ints, skipping blanks."""
+    return [int(rep) for rep in (reps_csv or '').split(',') if rep.strip().isdigit()]
+
+
+@migration(1)
+def backfill_log_sets(connection):
+    # Walk the logs in id order so memory stays flat regardless of history size
+    last_id = 0
+    while True:
+        rows = connection.execute(text(
+            "SELECT id, reps FROM logs "
+            "WHERE id > :last_id AND NOT EXISTS (SELECT 1 FROM log_sets WHERE log_sets.log_id = logs.id) "
+            "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+
+        log_sets = [
+            {"log_id": log_id, "set_number": set_number, "reps": reps}
+            for log_id, reps_csv in rows
+            for set_number, reps in enumerate(split_reps(reps_csv), 1)
+        ]
+        if log_sets:
+            connection.execute(insert(LogSet.__table__), log_sets)  # executemany in one round trip
+        last_id = rows[-1][0]
+
+
+@migration(2)
+def add_logs_keyset_index(connection):
+    create_index(connection, Log, 'ix_logs_user_id_timestamp_id')
+
+
+@migration(3)
+def add_foreign_key_indexes(connection):
+    # Every route & dashboard callback filters or joins on these
+    create_index(connection, Log, 'ix_logs_user_id_exercise_id_timestamp')
+    create_index(connection, Log, 'ix_logs_program_id')
+    create_index(connection, Log, 'ix_logs_exercise_id')
+    create_index(connection, Log, 'ix_logs_training_session_id')
+    create_index(connection, Log, 'ix_logs_training_week_id')
+    create_index(connection, MesoCycle, 'ix_meso_cycles_program_id')
+    create_index(connection, TrainingWeek, 'ix_training_weeks_meso_cycle_id_week_number')
+    create_index(connection, TrainingSession, 'ix_training_sessions_training_week_id')
+
+
+@migration(4)
+def backfill_weekly_volume(connection):
+    rebuild_weekly_volume(connection)
+
+
+@migration(5)
+def add_program_owners(connection):
+    if 'user_id' not in {column['name'] for column in inspect(connection).get_columns('programs')}:
+        connection.execute(text("ALTER TABLE programs ADD COLUMN user_id INTEGER REFERENCES users (id)"))
+
+    # Programs created before they had an owner belong to whoever logged against them first
+    connection.execute(text(
+        "UPDATE programs SET user_id = ("
+        "SELECT user_id FROM logs WHERE logs.program_id = programs.id ORDER BY timestamp, id LIMIT 1"
+        ") WHERE user_id IS NULL"
+    ))
+    create_index(connection, Program, 'ix_programs_user_id')
+    create_index(connection, Log, 'ix_logs_user_id_program_id')
@@ -20,15 +20,15 @@ class Log(db.Model):
     __tablename__ = 'logs'  # Define the table name
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Auto-incrementing primary key
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # User ID column
-    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # User ID column, indexed by the composites below
+    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=True, index=True)
     mesocycle_id = db.Column(db.Integer, db.ForeignKey('meso_cycles.id'), nullable=True)  # Mesocycle
-    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), nullable=False)  # Exercise ID column
-    training_session_id = db.Column(db.Integer, db.ForeignKey('training_sessions.id'), nullable=True)  # New session relationship
-    training_week_id = db.Column(db.Integer, db.ForeignKey('training_weeks.id'), nullable=True)  # Foreign key to TrainingWeek
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), nullable=False, index=True)  # Exercise ID column
+    training_session_id = db.Column(db.Integer, db.ForeignKey('training_sessions.id'), nullable=True, index=True)  # New session relationship
+    training_week_id = db.Column(db.Integer, db.ForeignKey('training_weeks.id'), nullable=True, index=True)  # Foreign key to TrainingWeek
     load = db.Column(db.Integer, nullable=False)  # Load column
     sets = db.Column(db.Integer, nullable=False)  # Sets column
-    reps = db.Column(db.String, nullable=False)  # Store reps as CSV string
+    reps = db.Column(db.String, nullable=False)  # Legacy CSV string of reps, per set rows live in LogSet
     rir = db.Column(db.Integer, nullable=False)  # RIR column
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Use current timestamp
 
@@ -39,12 +39,37 @@ class Log(db.Model):
     exercise = db.relationship('Exercise', backref=db.backref('logs', lazy=True))
     training_session = db.relationship('TrainingSession', backref=db.backref('logs', lazy=True))
     training_week = db.relationship('TrainingWeek', backref=db.backref('logs', lazy=True))  # Relationship to TrainingWeek
+    log_sets = db.relationship('LogSet', backref='log', lazy=True, order_by='LogSet.set_number')  # Typed per set rows
+
+    __table_args__ = (
+        # Keyset pagination of a user's history walks this index newest first
+        db.Index('ix_logs_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        # A user's history of one exercise over time
+        db.Index('ix_logs_user_id_exercise_id_timestamp', 'user_id', 'exercise_id', 'timestamp'),
+        # A user's logs of one program, what the dashboard filters on
+        db.Index('ix_logs_user_id_program_id', 'user_id', 'program_id'),
+    )
+
+class LogSet(db.Model):
+    __tablename__ = 'log_sets'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+
+    log_id = db.Column(db.Integer, db.ForeignKey('logs.id'), nullable=False)  # Foreign key to Log
+    set_number = db.Column(db.Integer, nullable=False)  # 1 for the first set, 2 for the second, etc.
+    reps = db.Column(db.Integer, nullable=False)
+    load = db.Column(db.Integer, nullable=True)  # Optional per set load, falls back to Log.load
+    rir = db.Column(db.Integer, nullable=True)  # Optional per set RIR, falls back to Log.rir
+
+    # One row per set of a log, also serves as the index for joining sets to their log
+    __table_args__ = (db.UniqueConstraint('log_id', 'set_number'),)
 
 class Program(db.Model):
     __tablename__ = 'programs'  # Define the table name
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Auto-incrementing primary key
     name = db.Column(db.String, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)  # Owner, empty for programs shared by everyone
 
     # Relationships
     meso_cycles = db.relationship('MesoCycle', backref='program', lazy=True)
@@ -56,7 +81,7 @@ class MesoCycle(db.Model):
 
     start_date = db.Column(db.Date, nullable=False)
     total_weeks = db.Column(db.Integer, nullable=False)  # New column for total weeks
-    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=False) # Foreign key to Program
+    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=False, index=True) # Foreign key to Program
 
     # Relationships
     training_weeks = db.relationship('TrainingWeek', backref='meso_cycle', lazy=True)
@@ -72,6 +97,9 @@ class TrainingWeek(db.Model):
     meso_cycle_id = db.Column(db.Integer, db.ForeignKey('meso_cycles.id'), nullable=False) # Foreign key to MesoCycle
     week_split = db.Column(db.String, nullable=False)
 
+    # Weeks are always looked up within their meso cycle, often by number
+    __table_args__ = (db.Index('ix_training_weeks_meso_cycle_id_week_number', 'meso_cycle_id', 'week_number'),)
+
     # Relationships
     training_sessions = db.relationship('TrainingSession', backref='training_week', lazy=True)
 
@@ -83,4 +111,26 @@ class TrainingSession(db.Model):
 
     name = db.Column(db.String, nullable=False)  # Name of the session (e.g., Upper Body, Lower Body)
     day_of_week = db.Column(db.Integer, nullable=False)  # Day of the week (1 for Monday, 2 for Tuesday, etc.)
-    training_week_id = db.Column(db.Integer, db.ForeignKey('training_weeks.id'), nullable=False) # Foreign key to TrainingWeek
+    training_week_id = db.Column(db.Integer, db.ForeignKey('training_weeks.id'), nullable=False, index=True) # Foreign key to TrainingWeek
+
+
+class WeeklyVolume(db.Model):
+    __tablename__ = 'weekly_volume'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+
+    # One row per user, week & exercise, summarizing every log of that exercise in that week
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=False, index=True)
+    mesocycle_id = db.Column(db.Integer, db.ForeignKey('meso_cycles.id'), nullable=False)
+    training_week_id = db.Column(db.Integer, db.ForeignKey('training_weeks.id'), nullable=False, index=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), nullable=False)
+
+    volume = db.Column(db.Integer, nullable=False, default=0)  # Sum of load * sets * total reps
+    load_total = db.Column(db.Integer, nullable=False, default=0)  # Sum of load
+    max_load = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    set_count = db.Column(db.Integer, nullable=False, default=0)  # Sum of sets
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'program_id', 'mesocycle_id', 'training_week_id', 'exercise_id'),)
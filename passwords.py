@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+from config import PASSWORD_HASH_ITERATIONS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_TIMEOUT, PASSWORD_HASH_WORKERS
+
+
+# PBKDF2 is deliberately slow, so it runs in a small pool of worker processes instead of
+# on the request thread. At most PASSWORD_HASH_QUEUE hashes are queued or running at once,
+# beyond that (or past PASSWORD_HASH_TIMEOUT seconds) requests are turned away rather
+# than piling up & stalling every other route.
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when a hash can't be computed in time because the pool is saturated."""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
+
+
+def hash_password(password):
+    """Hash a password with the configured PBKDF2 work factor."""
+    return _run(generate_password_hash, password, method=f'pbkdf2:sha256:{PASSWORD_HASH_ITERATIONS}', salt_length=16)
+
+
+def verify_password(pwhash, password):
+    """Check a password against its hash, whatever work factor it was hashed with."""
+    return _run(check_password_hash, pwhash, password)
+
+
+def _run(f, *args, **kwargs):
+    # PASSWORD_HASH_WORKERS=0 hashes inline, e.g. for local development
+    if PASSWORD_HASH_WORKERS == 0:
+        return f(*args, **kwargs)
+
+    try:
+        return _run_in_pool(f, *args, **kwargs)
+    except BrokenProcessPool:
+        # A hashing process died (e.g. killed for using too much memory), try once more with a fresh pool
+        return _run_in_pool(f, *args, **kwargs)
+
+
+def _run_in_pool(f, *args, **kwargs):
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashingBusy()
+    pool = _get_pool()
+    try:
+        future = pool.submit(f, *args, **kwargs)
+    except BaseException as e:
+        _slots.release()
+        if isinstance(e, BrokenProcessPool):
+            _discard_pool(pool)
+        raise
+    # The slot is freed once the hash is done, not when we give up waiting, so abandoned hashes still count
+    future.add_done_callback(lambda future: _slots.release())
+
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        raise PasswordHashingBusy()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
+
+def _get_pool():
+    """The process pool, created on first use in each process so forked servers each get their own."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # Start the hashing processes from a clean server process, forking a threaded web worker
+            # could copy a lock some other thread was holding
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context(method))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool, so the next hash starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
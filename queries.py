@@ -0,0 +1,390 @@
+from datetime import datetime
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db
+from models import Exercise, Log, LogSet, MesoCycle, Program, TrainingSession, TrainingWeek, WeeklyVolume
+
+
+# Logs shown per page of the history table
+PAGE_SIZE = 50
+
+
+def encode_cursor(log):
+    """Page cursor pointing at a log, e.g. '2024-05-01T18:30:00.123456_42'."""
+    return f"{log.timestamp.isoformat()}_{log.id}"
+
+
+def decode_cursor(cursor):
+    """Turn a page cursor back into its (timestamp, id) position. Raises ValueError when malformed."""
+    timestamp, log_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(log_id)
+
+
+def user_history(user_id):
+    """A user's logs newest first, with everything the history table shows loaded up front."""
+    return Log.query.filter(Log.user_id == user_id)\
+        .options(joinedload(Log.exercise), joinedload(Log.training_session), selectinload(Log.log_sets))\
+        .order_by(Log.timestamp.desc(), Log.id.desc())
+
+
+def logs_page(user_id, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    One page of a user's history using keyset pagination over (user_id, timestamp, id).
+
+    after: cursor of the last log on the current page, fetches the next (older) page.
+    before: cursor of the first log on the current page, fetches the previous (newer) page.
+    Returns (logs, next_cursor, prev_cursor), where a cursor is None when there is no such page.
+    """
+    position = tuple_(Log.timestamp, Log.id)
+    query = user_history(user_id)
+
+    if before:
+        # Walk towards newer logs then flip them back into newest first order
+        query = query.filter(position > decode_cursor(before)).order_by(None).order_by(Log.timestamp, Log.id)
+        logs = query.limit(page_size + 1).all()
+        has_newer = len(logs) > page_size
+        logs = logs[:page_size][::-1]
+        has_older = True
+    else:
+        if after:
+            query = query.filter(position < decode_cursor(after))
+        logs = query.limit(page_size + 1).all()
+        has_older = len(logs) > page_size
+        logs = logs[:page_size]
+        has_newer = after is not None
+
+    next_cursor = encode_cursor(logs[-1]) if logs and has_older else None
+    prev_cursor = encode_cursor(logs[0]) if logs and has_newer else None
+    return logs, next_cursor, prev_cursor
+
+
+def history_export(user_id):
+    """
+    SELECT of a user's whole history oldest first, one row per set with the names joined in.
+    Logs without per set rows still get one row, with an empty set number & reps.
+    """
+    return select(
+        Log.id.label('log_id'),
+        Log.timestamp,
+        Program.name.label('program'),
+        TrainingWeek.week_number.label('week'),
+        TrainingSession.name.label('session'),
+        Exercise.exercise_name.label('exercise'),
+        Log.sets,
+        LogSet.set_number,
+        LogSet.reps,
+        func.coalesce(LogSet.load, Log.load).label('load'),
+        func.coalesce(LogSet.rir, Log.rir).label('rir')
+    ).select_from(Log)\
+        .join(Exercise, Log.exercise_id == Exercise.id)\
+        .outerjoin(Program, Log.program_id == Program.id)\
+        .outerjoin(TrainingWeek, Log.training_week_id == TrainingWeek.id)\
+        .outerjoin(TrainingSession, Log.training_session_id == TrainingSession.id)\
+        .outerjoin(LogSet, LogSet.log_id == Log.id)\
+        .where(Log.user_id == user_id)\
+        .order_by(Log.timestamp, Log.id, LogSet.set_number)
+
+
+def visible_to(user_id):
+    """Filter on Program for the programs a user may see: their own plus the shared ones without an owner."""
+    return or_(Program.user_id == user_id, Program.user_id.is_(None))
+
+
+def user_programs(user_id):
+    """Programs visible to a user."""
+    return Program.query.filter(visible_to(user_id))
+
+
+def user_weeks(user_id, program_id):
+    """Training weeks of one of the user's programs."""
+    return TrainingWeek.query\
+        .join(MesoCycle, TrainingWeek.meso_cycle_id == MesoCycle.id)\
+        .join(Program, MesoCycle.program_id == Program.id)\
+        .filter(MesoCycle.program_id == program_id, visible_to(user_id))
+
+
+def user_sessions(user_id, program_id, week_id='all'):
+    """Training sessions of one of the user's programs, across all its weeks or in just one."""
+    query = TrainingSession.query\
+        .join(TrainingWeek, TrainingSession.training_week_id == TrainingWeek.id)\
+        .join(MesoCycle, TrainingWeek.meso_cycle_id == MesoCycle.id)\
+        .join(Program, MesoCycle.program_id == Program.id)\
+        .filter(MesoCycle.program_id == program_id, visible_to(user_id))
+
+    if week_id != 'all':
+        query = query.filter(TrainingSession.training_week_id == week_id)
+
+    return query
+
+
+# Dropdown options for the dashboard, one row per distinct week / session / exercise however many
+# logs it has, along with how many of the user's logs it holds & when the latest was logged.
+
+
+def week_options(user_id, program_id):
+    """(week_id, week_number, log_count, last_logged) of every week of one of the user's programs."""
+    return user_weeks(user_id, program_id)\
+        .outerjoin(Log, and_(Log.training_week_id == TrainingWeek.id, Log.user_id == user_id))\
+        .with_entities(TrainingWeek.id, TrainingWeek.week_number, func.count(Log.id), func.max(Log.timestamp))\
+        .group_by(TrainingWeek.id, TrainingWeek.week_number)\
+        .order_by(TrainingWeek.id)\
+        .all()
+
+
+def session_options(user_id, program_id, week_id='all'):
+    """(session_id, name, log_count, last_logged) of the sessions of one of the user's programs, across all its weeks or in just one."""
+    return user_sessions(user_id, program_id, week_id)\
+        .outerjoin(Log, and_(Log.training_session_id == TrainingSession.id, Log.user_id == user_id))\
+        .with_entities(TrainingSession.id, TrainingSession.name, func.count(Log.id), func.max(Log.timestamp))\
+        .group_by(TrainingSession.id, TrainingSession.name)\
+        .order_by(TrainingSession.id)\
+        .all()
+
+
+def exercise_options(user_id, program_id=None, week_id=None, session_id=None):
+    """(exercise_id, log_count, last_logged) of the distinct exercises a user logged under the dashboard filters."""
+    query = db.session.query(Log.exercise_id, func.count(Log.id), func.max(Log.timestamp)).select_from(Log)
+    query = filter_logs(query, user_id, program_id, week_id, session_id)
+    return query.group_by(Log.exercise_id).all()
+
+
+def program_structure(user_id, program_id):
+    """
+    Rows of a program's whole hierarchy in one outer joined query, one row per session
+    (or per week / meso cycle without any), ordered meso cycle, week number, session.
+    Empty when the program doesn't exist or isn't visible to the user.
+    """
+    return db.session.query(
+        Program.id, Program.name,
+        MesoCycle.id, MesoCycle.start_date, MesoCycle.total_weeks,
+        TrainingWeek.id, TrainingWeek.week_number, TrainingWeek.week_split,
+        TrainingSession.id, TrainingSession.name, TrainingSession.day_of_week
+    ).outerjoin(MesoCycle, MesoCycle.program_id == Program.id)\
+        .outerjoin(TrainingWeek, TrainingWeek.meso_cycle_id == MesoCycle.id)\
+        .outerjoin(TrainingSession, TrainingSession.training_week_id == TrainingWeek.id)\
+        .filter(Program.id == program_id, visible_to(user_id))\
+        .order_by(MesoCycle.id, TrainingWeek.week_number, TrainingWeek.id, TrainingSession.id)\
+        .all()
+
+
+# Aggregations for the dashboard. Grouping happens in the database so only the
+# summarized rows (weeks x exercises) ever reach pandas & Plotly.
+
+
+def reps_per_log():
+    """Total reps of the outer query's log, summed from its per set rows."""
+    # Correlated, so only the filtered logs have their sets looked up (via the log_sets unique index)
+    return db.session.query(func.coalesce(func.sum(LogSet.reps), 0))\
+        .filter(LogSet.log_id == Log.id)\
+        .correlate(Log)\
+        .scalar_subquery()
+
+
+def filter_logs(query, user_id, program_id=None, week_id=None, session_id=None, exercise_id=None):
+    """Join a query over a user's logs up the program hierarchy & apply the dashboard filters."""
+    query = query\
+        .join(TrainingSession, Log.training_session_id == TrainingSession.id)\
+        .join(TrainingWeek, TrainingSession.training_week_id == TrainingWeek.id, isouter=True)\
+        .filter(Log.user_id == user_id)
+
+    # User & program are both served by the (user_id, program_id) index on logs
+    if program_id:
+        query = query.filter(Log.program_id == program_id)
+
+    # "All Weeks" & "All Sessions" don't filter
+    if week_id and week_id != 'all':
+        query = query.filter(TrainingWeek.id == week_id)
+
+    if session_id and session_id != 'all':
+        query = query.filter(TrainingSession.id == session_id)
+
+    if exercise_id:
+        query = query.filter(Log.exercise_id == exercise_id)
+
+    return query
+
+
+def weekly_exercise_summary(user_id, program_id=None, week_id=None, session_id=None, exercise_id=None):
+    """
+    Total volume & load per week number and exercise.
+
+    Returns unordered (week_number, exercise_id, volume, load) rows,
+    where the volume of a log is load * sets * total reps.
+    """
+    # The weekly rollup already has these totals, unless a single session is picked
+    if not session_id or session_id == 'all':
+        return weekly_volume_summary(user_id, program_id, week_id, exercise_id)
+
+    query = db.session.query(
+        TrainingWeek.week_number,
+        Log.exercise_id,
+        func.sum(Log.load * Log.sets * reps_per_log()),
+        func.sum(Log.load)
+    ).select_from(Log)
+
+    query = filter_logs(query, user_id, program_id, week_id, session_id, exercise_id)
+    return query.group_by(TrainingWeek.week_number, Log.exercise_id).all()
+
+
+def weekly_volume_summary(user_id, program_id=None, week_id=None, exercise_id=None):
+    """Same rows as weekly_exercise_summary, read from the weekly_volume rollup instead of the logs."""
+    query = db.session.query(
+        TrainingWeek.week_number,
+        WeeklyVolume.exercise_id,
+        func.sum(WeeklyVolume.volume),
+        func.sum(WeeklyVolume.load_total)
+    ).join(TrainingWeek, WeeklyVolume.training_week_id == TrainingWeek.id)\
+        .filter(WeeklyVolume.user_id == user_id)
+
+    if program_id:
+        query = query.filter(WeeklyVolume.program_id == program_id)
+
+    if week_id and week_id != 'all':
+        query = query.filter(WeeklyVolume.training_week_id == week_id)
+
+    if exercise_id:
+        query = query.filter(WeeklyVolume.exercise_id == exercise_id)
+
+    return query.group_by(TrainingWeek.week_number, WeeklyVolume.exercise_id).all()
+
+
+def weekly_reps_per_set(user_id, program_id=None, week_id=None, session_id=None, exercise_id=None):
+    """
+    Reps summed per week number, exercise & set number.
+
+    Returns unordered (week_number, exercise_id, set_number, reps) rows.
+    """
+    query = db.session.query(
+        TrainingWeek.week_number,
+        Log.exercise_id,
+        LogSet.set_number,
+        func.sum(LogSet.reps)
+    ).select_from(Log)\
+        .join(LogSet, LogSet.log_id == Log.id)
+
+    query = filter_logs(query, user_id, program_id, week_id, session_id, exercise_id)
+    return query.group_by(TrainingWeek.week_number, Log.exercise_id, LogSet.set_number).all()
+
+
+
+# The client side dashboard (DASHBOARD_FILTERING=client) fetches these once per page & filters in the browser.
+# Totals are kept per session rather than per week, so every dropdown can still be applied.
+
+
+def user_hierarchy(user_id):
+    """
+    Every week & session of the programs visible to a user, as
+    (week_id, program_id, week_number) rows and (session_id, week_id, name) rows.
+    """
+    weeks = db.session.query(TrainingWeek.id, MesoCycle.program_id, TrainingWeek.week_number)\
+        .join(MesoCycle, TrainingWeek.meso_cycle_id == MesoCycle.id)\
+        .join(Program, MesoCycle.program_id == Program.id)\
+        .filter(visible_to(user_id))\
+        .order_by(TrainingWeek.id)\
+        .all()
+
+    sessions = db.session.query(TrainingSession.id, TrainingSession.training_week_id, TrainingSession.name)\
+        .join(TrainingWeek, TrainingSession.training_week_id == TrainingWeek.id)\
+        .join(MesoCycle, TrainingWeek.meso_cycle_id == MesoCycle.id)\
+        .join(Program, MesoCycle.program_id == Program.id)\
+        .filter(visible_to(user_id))\
+        .order_by(TrainingSession.id)\
+        .all()
+
+    return weeks, sessions
+
+
+def session_exercise_summary(user_id):
+    """
+    Total volume & load per program, session & exercise of all a user's logs.
+
+    Returns unordered (program_id, session_id, exercise_id, volume, load, log_count, last_logged) rows.
+    """
+    query = db.session.query(
+        Log.program_id,
+        TrainingSession.id,
+        Log.exercise_id,
+        func.sum(Log.load * Log.sets * reps_per_log()),
+        func.sum(Log.load),
+        func.count(Log.id),
+        func.max(Log.timestamp)
+    ).select_from(Log)
+
+    query = filter_logs(query, user_id)
+    return query.group_by(Log.program_id, TrainingSession.id, Log.exercise_id).all()
+
+
+def session_reps_per_set(user_id):
+    """
+    Reps summed per program, session, exercise & set number of all a user's logs.
+
+    Returns unordered (program_id, session_id, exercise_id, set_number, reps) rows.
+    """
+    query = db.session.query(
+        Log.program_id,
+        TrainingSession.id,
+        Log.exercise_id,
+        LogSet.set_number,
+        func.sum(LogSet.reps)
+    ).select_from(Log)\
+        .join(LogSet, LogSet.log_id == Log.id)
+
+    query = filter_logs(query, user_id)
+    return query.group_by(Log.program_id, TrainingSession.id, Log.exercise_id, LogSet.set_number).all()
+
+
+# Time series (see timeseries.py), binned by the database. Bin starts come back as dates
+# (or date strings on SQLite), weeks start on Monday.
+BIN_STARTS = {
+    'sqlite': {
+        'day': lambda timestamp: func.date(timestamp),
+        'week': lambda timestamp: func.date(timestamp, 'weekday 0', '-6 days'),
+        'month': lambda timestamp: func.date(timestamp, 'start of month'),
+    },
+    'postgresql': {
+        'day': lambda timestamp: func.date_trunc('day', timestamp),
+        'week': lambda timestamp: func.date_trunc('week', timestamp),
+        'month': lambda timestamp: func.date_trunc('month', timestamp),
+    },
+}
+
+
+def binned_sets(user_id, bin, program_id=None, exercise_id=None):
+    """
+    A user's sets summarized per time bin ('day', 'week', 'month' or 'mesocycle') & exercise.
+
+    Returns unordered (bin_start, exercise_id, volume, top_load, reps, best_e1rm, top_reps) rows, where
+    volume is load * sets * reps like the dashboard's and the estimated 1RM of a set is Epley's load * (1 + reps / 30).
+    Mesocycle bins start on the meso cycle's start date, those starting the same day share it.
+    Logs saved before per set rows existed are left out.
+    """
+    load = func.coalesce(LogSet.load, Log.load)
+    e1rm = case((LogSet.reps == 1, load), (LogSet.reps > 1, load * (1 + LogSet.reps / 30.0)), else_=None)
+
+    if bin == 'mesocycle':
+        bin_start = MesoCycle.start_date
+    else:
+        bin_start = BIN_STARTS[db.session.get_bind().dialect.name][bin](Log.timestamp)
+
+    query = db.session.query(
+        bin_start,
+        Log.exercise_id,
+        func.sum(Log.load * Log.sets * LogSet.reps),
+        func.max(load),
+        func.sum(LogSet.reps),
+        func.max(e1rm),
+        func.max(LogSet.reps)
+    ).select_from(Log)\
+        .join(LogSet, LogSet.log_id == Log.id)\
+        .filter(Log.user_id == user_id)
+
+    if bin == 'mesocycle':
+        query = query.join(MesoCycle, Log.mesocycle_id == MesoCycle.id)
+
+    if program_id:
+        query = query.filter(Log.program_id == program_id)
+
+    if exercise_id:
+        query = query.filter(Log.exercise_id == exercise_id)
+
+    return query.group_by(bin_start, Log.exercise_id).all()
@@ -0,0 +1,104 @@
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Log, LogSet, WeeklyVolume
+
+
+# weekly_volume holds one row per (user, program, meso cycle, week, exercise) so the
+# dashboard reads weeks x exercises rows instead of every log. It's kept up to date
+# inside the same transaction that inserts the logs, and can be rebuilt from scratch.
+
+KEY = ('user_id', 'program_id', 'mesocycle_id', 'training_week_id', 'exercise_id')
+TOTALS = ('volume', 'load_total', 'total_reps', 'set_count', 'log_count')
+
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def add_to_weekly_volume(logs, reps):
+    """
+    Fold newly inserted logs into weekly_volume. Doesn't commit.
+
+    logs: list of dicts of Log columns.
+    reps: list of the same length holding each log's reps per set.
+    """
+    rows = {}
+    for log, log_reps in zip(logs, reps):
+        key = tuple(log[column] for column in KEY)
+        # Logs outside the program hierarchy never show on the dashboard
+        if None in key:
+            continue
+
+        row = rows.setdefault(key, dict(zip(KEY, key), max_load=0, **dict.fromkeys(TOTALS, 0)))
+        row['volume'] += log['load'] * log['sets'] * sum(log_reps)
+        row['load_total'] += log['load']
+        row['max_load'] = max(row['max_load'], log['load'])
+        row['total_reps'] += sum(log_reps)
+        row['set_count'] += log['sets']
+        row['log_count'] += 1
+
+    if rows:
+        upsert_weekly_volume(list(rows.values()))
+
+
+def upsert_weekly_volume(rows):
+    """Add rows onto weekly_volume, atomically, so concurrent workers can't lose each other's updates."""
+    table = WeeklyVolume.__table__
+    statement = UPSERT_DIALECTS[db.session.get_bind().dialect.name](table)
+    excluded = statement.excluded
+
+    statement = statement.on_conflict_do_update(
+        index_elements=KEY,
+        set_={
+            **{column: table.c[column] + excluded[column] for column in TOTALS},
+            'max_load': case((excluded.max_load > table.c.max_load, excluded.max_load), else_=table.c.max_load),
+        }
+    )
+    db.session.execute(statement, rows)
+
+
+def weekly_volume_from_logs():
+    """SELECT computing every weekly_volume row from the logs themselves, in KEY + max_load + TOTALS column order."""
+    total_reps = select(func.coalesce(func.sum(LogSet.reps), 0))\
+        .where(LogSet.log_id == Log.id)\
+        .correlate(Log)\
+        .scalar_subquery()
+    key = [getattr(Log, column) for column in KEY]
+
+    return select(
+        *key,
+        func.max(Log.load),
+        func.sum(Log.load * Log.sets * total_reps),
+        func.sum(Log.load),
+        func.sum(total_reps),
+        func.sum(Log.sets),
+        func.count(Log.id)
+    ).where(*[column.isnot(None) for column in key])\
+        .group_by(*key)
+
+
+def rebuild_weekly_volume(connection):
+    """Recompute weekly_volume from scratch with a single INSERT ... SELECT."""
+    table = WeeklyVolume.__table__
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select([*KEY, 'max_load', *TOTALS], weekly_volume_from_logs()))
+
+
+def check_weekly_volume(connection):
+    """Compare weekly_volume with the logs. Returns a list of (key, stored, expected) for every row that differs."""
+    columns = ['max_load', *TOTALS]
+    table = WeeklyVolume.__table__
+
+    stored = {
+        tuple(row[:len(KEY)]): tuple(row[len(KEY):])
+        for row in connection.execute(select(*[table.c[column] for column in (*KEY, *columns)]))
+    }
+    expected = {
+        tuple(row[:len(KEY)]): tuple(row[len(KEY):])
+        for row in connection.execute(weekly_volume_from_logs())
+    }
+
+    return [
+        (dict(zip(KEY, key)), dict(zip(columns, stored.get(key, ()))), dict(zip(columns, expected.get(key, ()))))
+        for key in sorted(stored.keys() | expected.keys())
+        if stored.get(key) != expected.get(key)
+    ]
@@ -0,0 +1,97 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from cache import exercise_catalog, figure_cache
+from extensions import db
+from models import Exercise, Log, LogSet
+from rollups import add_to_weekly_volume
+
+
+# Dialects whose INSERT can skip rows that would break a unique constraint
+ON_CONFLICT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Write helpers shared by the routes that record training. None of them commit,
+# the caller commits once so a whole submission lands in a single transaction.
+
+
+def resolve_exercise_ids(names):
+    """
+    Map exercise names to their ids from the exercise catalog cache (one IN query for any misses),
+    bulk inserting the names that don't exist yet.
+    """
+    names = set(names)
+    exercise_ids = exercise_catalog.lookup_ids(names)
+
+    missing = sorted(name for name in names if name not in exercise_ids)
+    if not missing:
+        return exercise_ids
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ON_CONFLICT_INSERTS:
+        # Names another worker added in the meantime are skipped rather than failing the insert, so no
+        # savepoint is needed (pysqlite's would commit the transaction early, when it's the first write)
+        table = Exercise.__table__
+        new_ids = dict(db.session.execute(
+            ON_CONFLICT_INSERTS[dialect](table).on_conflict_do_nothing(index_elements=['exercise_name'])
+            .returning(table.c.exercise_name, table.c.id),
+            [{'exercise_name': name} for name in missing]
+        ).all())
+    else:
+        try:
+            # Savepoint, so losing a race with another worker only undoes this insert
+            with db.session.begin_nested():
+                new_ids = dict(zip(missing, insert_returning_ids(Exercise, [{'exercise_name': name} for name in missing])))
+        except IntegrityError:
+            # Someone else added some of them in the meantime, look those up & try again with the rest
+            if not exercise_catalog.lookup_ids(missing):
+                raise  # None of them, so it wasn't a race
+            return resolve_exercise_ids(names)
+
+    exercise_ids.update(new_ids)
+    exercise_catalog.remember_after_commit(db.session, new_ids.items())
+
+    # Names skipped because someone else added them in the meantime
+    skipped = [name for name in missing if name not in new_ids]
+    if skipped:
+        exercise_ids.update(exercise_catalog.lookup_ids(skipped))
+    return exercise_ids
+
+
+def insert_returning_ids(model, rows):
+    """Bulk insert rows (dicts of columns) into a model's table, returning their new ids in order."""
+    # Core inserts on the table rather than ORM bulk inserts, which spend more time building
+    # each row's parameters than SQLite spends storing it once there are thousands of them
+    table = model.__table__
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # SQLite gives each new row the rowid after the table's largest, in VALUES order, so sorting
+        # the returned ids gives insertion order. sort_by_parameter_order would insert row by row here.
+        return sorted(db.session.scalars(insert(table).returning(table.c.id), rows).all())
+
+    return db.session.scalars(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).all()
+
+
+def insert_logs(logs, reps):
+    """
+    Bulk insert logs & their per set rows, and fold them into the weekly volume rollup.
+
+    logs: list of dicts of Log columns.
+    reps: list of the same length holding each log's reps per set, e.g. [10, 8, 8].
+    Returns the ids of the new logs in order.
+    """
+    if not logs:
+        return []
+
+    log_ids = insert_returning_ids(Log, logs)
+
+    log_sets = [
+        {'log_id': log_id, 'set_number': set_number, 'reps': rep}
+        for log_id, log_reps in zip(log_ids, reps)
+        for set_number, rep in enumerate(log_reps, 1)
+    ]
+    if log_sets:
+        db.session.execute(insert(LogSet.__table__), log_sets)
+
+    add_to_weekly_volume(logs, reps)
+    figure_cache.invalidate_programs_after_commit(db.session, {log['program_id'] for log in logs})
+
+    return log_ids
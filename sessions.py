@@ -0,0 +1,81 @@
+import os
+import secrets
+from functools import wraps
+from flask import redirect, session
+from flask_session import Session
+from extensions import db
+
+
+# Where session["user_id"] lives between requests, picked with SESSION_BACKEND:
+#   cookie      Flask's signed cookie. No server side storage at all, plenty for the user id we keep.
+#   sqlalchemy  A sessions table in the app's database, expired rows swept every SESSION_CLEANUP_N_REQUESTS.
+#   redis       Any Redis compatible server at SESSION_REDIS_URL, fakeredis:// runs an in process stand-in.
+#   filesystem  Files in the flask_session folder, the old behaviour.
+SESSION_BACKENDS = ('cookie', 'sqlalchemy', 'redis', 'filesystem')
+
+
+def init_sessions(app):
+    """Set up the session backend named by the app's SESSION_BACKEND config. Call after init_db."""
+    backend = app.config['SESSION_BACKEND']
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"SESSION_BACKEND must be one of {', '.join(SESSION_BACKENDS)}, not {backend!r}")
+
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = instance_secret_key(app)
+
+    # Flask signs its cookie session out of the box, Flask-Session is only needed for server side storage
+    if backend == 'cookie':
+        return
+
+    app.config['SESSION_TYPE'] = backend
+    app.config['SESSION_USE_SIGNER'] = True
+    if backend == 'sqlalchemy':
+        app.config.setdefault('SESSION_SQLALCHEMY', db)
+    elif backend == 'redis':
+        app.config.setdefault('SESSION_REDIS', redis_client(app.config['SESSION_REDIS_URL']))
+
+    with app.app_context():
+        Session(app)
+
+
+def instance_secret_key(app):
+    """
+    A random secret key kept in the instance folder, created on first use.
+    Every worker sharing the instance folder reads the same key, so sessions survive restarts.
+    """
+    path = os.path.join(app.instance_path, 'secret_key')
+    os.makedirs(app.instance_path, exist_ok=True)
+    try:
+        # O_EXCL, so when several workers start at once only one of them writes the key
+        with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    with open(path) as f:
+        return f.read().strip()
+
+
+def redis_client(url):
+    """Client for a Redis compatible server, or an in process fakeredis for fakeredis:// URLs."""
+    if url.startswith('fakeredis://'):
+        import fakeredis
+        return fakeredis.FakeRedis()
+
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def login_required(f):
+    """
+    Decorate routes to require login.
+
+    https://flask.palletsprojects.com/en/latest/patterns/viewdecorators/
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if session.get("user_id") is None:
+            return redirect("/login")
+        return f(*args, **kwargs)
+
+    return decorated_function
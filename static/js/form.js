@@ -97,58 +97,65 @@ window.addEventListener('beforeunload', function (event) {
     }
 });
 
-function fetchTrainingDays() {
+// Program structures already fetched this page load, by program id, so selecting a program again costs nothing
+const programStructures = new Map();
+
+// Fetch the selected program's weeks & training days in one request, then fill both dropdowns
+function fetchProgramStructure() {
     const programId = document.getElementById('program').value;
+    const weekDropdown = document.getElementById('week_number');
     const sessionDaySelect = document.getElementById('session_day');
 
     // Clear existing options
+    weekDropdown.innerHTML = '<option value="" disabled selected>Select a Week</option>';
     sessionDaySelect.innerHTML = '<option value="" disabled selected>Select Day</option>';
 
-    if (programId) {
-        fetch(`/get_training_days/${programId}`)
-            .then(response => response.json())
-            .then(data => {
-                data.forEach(([day, day_name]) => {
-                    const option = document.createElement('option');
-                    option.value = day;
-                    option.textContent = day_name;
-                    sessionDaySelect.appendChild(option);
-                });
-            })
-            .catch(error => {
-                console.error('Error fetching training days:', error);
-            });
+    if (!programId) {
+        return;
     }
-}
-
-function fetchTrainingWeeks() {
-    const programId = document.getElementById('program').value;
-    const weekDropdown = document.getElementById('week_number');
 
-    // Clear existing options
-    weekDropdown.innerHTML = '<option value="" disabled selected>Select a Week</option>';
-
-    if (programId) {
-        fetch(`/get_training_weeks/${programId}`)
-            .then(response => response.json())
-            .then(data => {
-                const totalWeeks = data.total_weeks;
-                if (totalWeeks > 0) {
-                    // Populate the dropdown with week numbers from 1 to maxWeek
-                    for (let i = 1; i <= totalWeeks; i++) {
-                        const option = document.createElement('option');
-                        option.value = i;
-                        option.textContent = `Week ${i}`;
-                        weekDropdown.appendChild(option);
-                    }
-                } else {
-                    console.log('No training weeks found for this program.');
+    if (!programStructures.has(programId)) {
+        // The browser revalidates with the ETag, so an unchanged program comes back as a bodyless 304
+        programStructures.set(programId, fetch(`/api/programs/${programId}/structure`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
                 }
+                return response.json();
             })
             .catch(error => {
-                console.error('Error fetching training weeks:', error);
-            });
+                programStructures.delete(programId);  // Try again next time
+                throw error;
+            }));
     }
-}
 
+    programStructures.get(programId)
+        .then(structure => {
+            // Stale response for a program that's no longer selected
+            if (document.getElementById('program').value !== programId) {
+                return;
+            }
 
+            if (structure.total_weeks > 0) {
+                // Populate the dropdown with week numbers from 1 to maxWeek
+                for (let i = 1; i <= structure.total_weeks; i++) {
+                    const option = document.createElement('option');
+                    option.value = i;
+                    option.textContent = `Week ${i}`;
+                    weekDropdown.appendChild(option);
+                }
+            } else {
+                console.log('No training weeks found for this program.');
+            }
+
+            structure.training_days.forEach(([day, day_name]) => {
+                const option = document.createElement('option');
+                option.value = day;
+                option.textContent = day_name;
+                sessionDaySelect.appendChild(option);
+            });
+        })
+        .catch(error => {
+            console.error('Error fetching program structure:', error);
+        });
+}
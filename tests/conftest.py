@@ -0,0 +1,34 @@
+import os
+import tempfile
+import pytest
+
+# config.py reads these when imported, so they have to be set before any test imports the app
+DATABASE = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+os.environ.setdefault('SECRET_KEY', 'tests')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+@pytest.fixture(scope='session')
+def reseed():
+    """A function replacing the test database with a new one seeded by benchmarks.seed(**kwargs), returning the logs seeded."""
+    from app import app, create_db
+    from benchmarks.seed import seed
+    from cache import exercise_catalog, figure_cache
+    from extensions import db
+
+    def reseed(**kwargs):
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        for path in (DATABASE, DATABASE + '-wal', DATABASE + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        figure_cache.invalidate()
+        exercise_catalog.invalidate()
+
+        create_db()
+        with app.app_context():
+            return seed(**kwargs)
+
+    return reseed
@@ -0,0 +1,111 @@
+"""
+Benchmarks of the hot paths at growing data sizes, with pytest-benchmark (pip install pytest-benchmark).
+
+    BENCHMARK_LOGS=1000,10000,100000 python -m pytest tests/test_benchmarks.py --benchmark-autosave
+
+For every size in BENCHMARK_LOGS (1000 by default) the test database is seeded anew with
+about that many logs (see benchmarks/seed.py), then the real app is timed doing what users do most:
+submit_log, /display, login, and the dashboard callbacks load_weeks, load_sessions, load_exercises
+& update_graph for each metric (with the figure cache cleared, and cached for update_graph), plus
+load_dataset, which the client side dashboard calls instead of all of those, and the weekly
+estimated 1RM series of /api/timeseries.
+
+Compare a run against the last saved one, failing on regressions as the data grows from 1k to 1M logs:
+
+    python -m pytest tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=median:25%
+
+Leave these out of a quick run of the other tests with --benchmark-skip.
+"""
+import os
+import pytest
+from flask import session
+from app import app
+from cache import figure_cache
+from extensions import db
+
+pytest.importorskip('pytest_benchmark')
+
+# Logs seeded per user: 2 programs x 1 meso cycle x 8 weeks x 3 sessions x 5 exercises
+LOGS_PER_USER = 240
+
+# Seeded user 1 owns programs 1 & 2
+USER_ID = 1
+
+# Dashboard callbacks as (module, function, arguments, with the figure cache cleared first)
+CALLBACKS = {
+    'load_weeks': ('dashboard', 'load_weeks', (1,), True),
+    'load_sessions': ('dashboard', 'load_sessions', ('all', 1), True),
+    'load_exercises': ('dashboard', 'load_exercises', (1, 1, 'all'), True),
+    'update_graph volume': ('dashboard', 'update_graph', (1, 'all', 'all', None, 'volume'), True),
+    'update_graph load': ('dashboard', 'update_graph', (1, 'all', 'all', None, 'load'), True),
+    'update_graph reps': ('dashboard', 'update_graph', (1, 'all', 'all', None, 'reps'), True),
+    'update_graph cached': ('dashboard', 'update_graph', (1, 'all', 'all', None, 'volume'), False),
+    # The one server round trip per page with DASHBOARD_FILTERING=client
+    'load_dataset': ('dashboard', 'load_dataset', ('/dashboard/',), True),
+    'timeseries e1rm': ('timeseries', 'exercise_series', (1, 'e1rm', 'week'), True),
+}
+
+
+def pytest_generate_tests(metafunc):
+    # Every test runs once per size, the tests of one size together so each size is seeded once
+    if 'logs' in metafunc.fixturenames:
+        sizes = [int(size) for size in os.environ.get('BENCHMARK_LOGS', '1000').split(',')]
+        metafunc.parametrize('logs', sizes, ids=[f'{size}-logs' for size in sizes], scope='module')
+
+
+@pytest.fixture(scope='module')
+def client(logs, reseed):
+    reseed(users=max(1, logs // LOGS_PER_USER))
+    client = app.test_client()
+    client.post('/register', data={'username': 'bench', 'password': 'bench', 'confirmation': 'bench'})
+    with client.session_transaction() as client_session:
+        client_session['user_id'] = USER_ID
+    return client
+
+
+@pytest.fixture
+def benchmark_size(benchmark, logs):
+    """The benchmark fixture, with results grouped by data size."""
+    benchmark.group = f'{logs} logs'
+    return benchmark
+
+
+def ok(response):
+    # A benchmark of an error page would measure the wrong thing
+    assert response.status_code < 400, f"{response.request.path} answered {response.status}"
+    return response
+
+
+def test_submit_log(client, benchmark_size):
+    benchmark_size(lambda: ok(client.post('/submit-log', data={
+        'program_id': '1', 'week_number': '1', 'session_day': '1', 'session_name': 'Bench',
+        'exercise_name[]': ['Squat', 'Bench Press', 'Barbell Row'], 'load[]': ['100', '80', '60'],
+        'sets[]': ['3', '3', '2'], 'rir[]': ['2', '2', '1'],
+        'reps[0][]': ['5', '5', '5'], 'reps[1][]': ['8', '8', '6'], 'reps[2][]': ['10', '10'],
+    })))
+
+
+def test_display(client, benchmark_size):
+    benchmark_size(lambda: ok(client.get('/display')))
+
+
+def test_login(client, benchmark_size):
+    # Hashes the password, so it gets fewer rounds
+    benchmark_size.pedantic(lambda: ok(client.post('/login', data={'username': 'bench', 'password': 'bench'})),
+                            rounds=5, warmup_rounds=1)
+
+
+@pytest.mark.parametrize('name', CALLBACKS)
+def test_callback(client, benchmark_size, name):
+    module, function, args, cold = CALLBACKS[name]
+    f = getattr(__import__(module), function)
+
+    def call():
+        if cold:
+            figure_cache.invalidate()
+        with app.test_request_context():
+            session['user_id'] = USER_ID
+            f(*args)
+            db.session.remove()
+
+    benchmark_size(call)
@@ -0,0 +1,17 @@
+"""Importing the app must not import the dashboard's heavy dependencies, which load on first use instead."""
+import json
+import os
+import subprocess
+import sys
+from benchmarks.import_time import HEAVY
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_imports_without_dashboard_dependencies():
+    # A fresh interpreter, this one has imported them already for other tests
+    result = subprocess.run(
+        [sys.executable, '-c', f'import app, json, sys; print(json.dumps(sorted(m for m in {HEAVY!r} if m in sys.modules)))'],
+        capture_output=True, text=True, cwd=ROOT, env=dict(os.environ, DASHBOARD='lazy'), check=True
+    )
+    assert json.loads(result.stdout.splitlines()[-1]) == []
@@ -0,0 +1,102 @@
+"""
+The hot paths run a fixed number of SQL statements however long the user's history gets,
+so an N+1 query creeping back in fails here rather than in production.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+import pytest
+from flask import session
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from app import app
+from cache import exercise_catalog, figure_cache
+from extensions import db
+from models import Log
+from services import insert_logs
+
+# Seeded user 1 owns programs 1 & 2
+USER_ID = 1
+PROGRAM_ID = 1
+
+
+@pytest.fixture(scope='module')
+def client(reseed):
+    reseed(users=2, weeks=4)
+    client = app.test_client()
+    with client.session_transaction() as client_session:
+        client_session['user_id'] = USER_ID
+    return client
+
+
+@contextmanager
+def counting_statements():
+    """Collect every statement the app's engine runs inside the block."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+
+def grow_history(times):
+    """Log everything user 1 has logged again, `times` times over, a week later each time."""
+    with app.app_context():
+        logs = Log.query.filter_by(user_id=USER_ID).options(selectinload(Log.log_sets)).all()
+        columns = [column.name for column in Log.__table__.columns if column.name != 'id']
+        for i in range(1, times + 1):
+            rows = [{column: getattr(log, column) for column in columns} for log in logs]
+            for row in rows:
+                row['timestamp'] += timedelta(weeks=i)
+            insert_logs(rows, [[log_set.reps for log_set in log.log_sets] for log in logs])
+        db.session.commit()
+        return Log.query.filter_by(user_id=USER_ID).count()
+
+
+def callback(f, *args):
+    def call():
+        with app.test_request_context():
+            session['user_id'] = USER_ID
+            f(*args)
+            db.session.remove()
+    return call
+
+
+def statement_counts(client):
+    """Statements run by each hot path with cold caches, by name."""
+    import dashboard
+
+    paths = {
+        '/display': lambda: client.get('/display'),
+        'load_exercises': callback(dashboard.load_exercises, 'all', PROGRAM_ID, 'all'),
+    }
+    for metric in ('volume', 'load', 'reps'):
+        paths[f'update_graph {metric}'] = callback(dashboard.update_graph, PROGRAM_ID, 'all', 'all', None, metric)
+
+    counts = {}
+    for name, path in paths.items():
+        figure_cache.invalidate()
+        exercise_catalog.invalidate()
+        with counting_statements() as statements:
+            path()
+        counts[name] = len(statements)
+    return counts
+
+
+def test_statements_per_request_dont_grow_with_history(client):
+    assert client.get('/display').status_code == 200
+
+    small = statement_counts(client)
+    logs = grow_history(7)
+    large = statement_counts(client)
+
+    assert logs >= 500
+    assert large == small
+    for name, count in small.items():
+        assert count <= 10, f"{name} ran {count} statements"
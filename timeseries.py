@@ -0,0 +1,144 @@
+from datetime import date, datetime
+from cache import exercise_catalog, figure_cache
+from queries import binned_sets
+
+
+# Time series of a user's training for charts spanning months or years, served by /api/timeseries.
+# The database sums the sets per day, week, month or meso cycle & exercise (see binned_sets), the
+# bins are cached like the dashboard figures, and every series is downsampled to at most
+# SERIES_MAX_POINTS points, so a response stays the same size however long the history gets.
+SERIES_MAX_POINTS = 500
+
+SERIES_BINS = ('day', 'week', 'month', 'mesocycle')
+
+# Metric -> its column in the binned_sets rows
+SERIES_METRICS = {
+    'volume': 2,  # load * sets * reps, summed
+    'load': 3,  # heaviest set
+    'reps': 4,  # summed
+    'e1rm': 5,  # best estimated 1RM of a set
+    'top_reps': 6,  # most reps in a set
+}
+
+
+def exercise_bins(user_id, bin, program_id=None, exercise_id=None):
+    """The binned_sets rows as {exercise_id: [(bin date, row), ...]} oldest first, cached until the program gets new logs."""
+    key = (user_id, program_id, None, None, exercise_id, f'{bin} bins')
+    return figure_cache.get_or_build(key, lambda: group_bins(binned_sets(user_id, bin, program_id, exercise_id)))
+
+
+def group_bins(rows):
+    by_exercise = {}
+    for row in rows:
+        by_exercise.setdefault(row[1], []).append((as_date(row[0]), row))
+    for bins in by_exercise.values():
+        bins.sort(key=lambda bin: bin[0])
+    return by_exercise
+
+
+def as_date(value):
+    """A bin start as a date, whichever of date, datetime or ISO string the database returned."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def exercise_series(user_id, metric, bin='week', program_id=None, exercise_id=None, points=SERIES_MAX_POINTS, best=False):
+    """
+    A series of the metric per bin for every exercise the user logged (or just exercise_id), by exercise name.
+    Each is a dict of exercise_id, exercise, bins (how many there were) and x (ISO dates) & y, downsampled to
+    at most `points` points. With best=True only the bins setting a new best are kept, e.g. the estimated 1RM PRs over time.
+    """
+    column = SERIES_METRICS[metric]
+    by_exercise = exercise_bins(user_id, bin, program_id, exercise_id)
+    names = exercise_catalog.lookup_names(by_exercise.keys())
+
+    series = []
+    for exercise, bins in by_exercise.items():
+        values = [(day, row[column]) for day, row in bins if row[column] is not None]
+        binned = len(values)
+        if best:
+            values = new_bests(values)
+        sampled = lttb(values, points)
+        series.append({
+            'exercise_id': exercise,
+            'exercise': names.get(exercise),
+            'bins': binned,
+            'x': [day.isoformat() for day, _ in sampled],
+            'y': [round(value, 1) if isinstance(value, float) else value for _, value in sampled],
+        })
+    return sorted(series, key=lambda exercise_series: exercise_series['exercise'] or '')
+
+
+def personal_records(user_id):
+    """
+    Every exercise's heaviest set, best estimated 1RM, most reps in a set & biggest day of volume,
+    each with the day it was first reached. Worked out from the daily bins once & cached.
+    """
+    def build():
+        by_exercise = exercise_bins(user_id, 'day')
+        names = exercise_catalog.lookup_names(by_exercise.keys())
+        records = []
+        for exercise, bins in by_exercise.items():
+            record = {'exercise_id': exercise, 'exercise': names.get(exercise)}
+            for metric in ('load', 'e1rm', 'top_reps', 'volume'):
+                column = SERIES_METRICS[metric]
+                # Highest value, the earliest day wins ties
+                value, day = max(((row[column], day) for day, row in bins if row[column] is not None),
+                                 key=lambda best: (best[0], -best[1].toordinal()), default=(None, None))
+                record[metric] = {
+                    'value': round(value, 1) if isinstance(value, float) else value,
+                    'date': day.isoformat() if day else None,
+                }
+            records.append(record)
+        return sorted(records, key=lambda record: record['exercise'] or '')
+
+    return figure_cache.get_or_build((user_id, None, None, None, None, 'personal records'), build)
+
+
+def new_bests(values):
+    """
+    The (x, y) pairs where y beat every earlier y, plus the last x at the best y, so a line through
+    them steps up at each record & reaches the present. Only those points carry information.
+    """
+    result = []
+    for x, y in values:
+        if not result or y > result[-1][1]:
+            result.append((x, y))
+    if values and result[-1][0] != values[-1][0]:
+        result.append((values[-1][0], result[-1][1]))
+    return result
+
+
+def lttb(values, threshold):
+    """
+    Downsample (date, y) pairs sorted by date to `threshold` of them with Largest Triangle Three Buckets,
+    which keeps the first & last point and, from every bucket in between, the one that best preserves
+    the line's shape (peaks & troughs included).
+    """
+    if threshold >= len(values) or threshold < 3:
+        return values
+
+    points = [(day.toordinal(), y) for day, y in values]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    sampled = [values[0]]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # The third corner of the triangles is the average of the next bucket
+        next_points = points[end:min(int((bucket + 2) * bucket_size) + 1, len(points))] or points[-1:]
+        average_x = sum(x for x, _ in next_points) / len(next_points)
+        average_y = sum(y for _, y in next_points) / len(next_points)
+
+        previous_x, previous_y = points[previous]
+        previous = max(range(start, end), key=lambda i: abs(
+            (previous_x - average_x) * (points[i][1] - previous_y) - (previous_x - points[i][0]) * (average_y - previous_y)
+        ))
+        sampled.append(values[previous])
+
+    sampled.append(values[-1])
+    return sampled